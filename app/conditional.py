@@ -0,0 +1,70 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response, status
+
+# the body may be cached, but has to be revalidated on every use
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def has_validators(request: Request) -> bool:
+    # without one a version lookup ahead of the full query is wasted
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return True
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+
+    # HTTP dates have whole second precision
+    return last_modified.replace(microsecond=0) > since
+
+
+def not_modified(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: datetime | None = None,
+) -> Response | None:
+    """Answers a conditional GET.
+
+    Returns a 304 response when the client's copy is still current,
+    otherwise sets the validators on response and returns None so the
+    route can carry on and build the body. If-Modified-Since is only used
+    when there is no If-None-Match, as RFC 9110 requires.
+    """
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(
+            last_modified.astimezone(timezone.utc), usegmt=True
+        )
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        fresh = etag_matches(if_none_match, etag)
+    elif if_modified_since and last_modified:
+        fresh = not modified_since(if_modified_since, last_modified)
+    else:
+        fresh = False
+
+    if fresh:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return None
@@ -1,4 +1,4 @@
-from pydantic import ConfigDict
+from pydantic import ConfigDict, model_validator
 from pydantic_settings import BaseSettings
 
 
@@ -12,9 +12,49 @@ class Settings(BaseSettings):
     secret_key: str
     algorithm: str
     access_token_expire_minutes: int
+    # replaces the postgres connection settings. Meant for benchmarks: on
+    # SQLite (sqlite:///./fitness.db) the stats routes, full-text post search
+    # and post cursors are unsupported, and the async routes can't be used
+    database_url: str | None = None
+    database_async: bool = False
+    # create missing tables on startup, off so workers don't all run DDL checks
+    database_schema_sync: bool = False
+    # range partition the metric tables by date (Postgres only). Applies when
+    # the tables are created, existing tables have to be migrated by hand
+    database_partition_metrics: bool = False
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_pool_timeout: float = 30
+    database_pool_recycle: int = 1800
+    database_pool_pre_ping: bool = True
+    # read only routes are spread over these, a JSON list in the environment
+    database_replica_urls: list[str] = []
+    # a user's reads go to the primary for this long after they write, so
+    # they see their own changes despite replication lag
+    database_read_your_writes_seconds: float = 5
+    # writers tracked per worker, others carry the same state in a cookie
+    database_recent_writers_max_size: int = 10000
+    # a replica that failed is skipped for this long
+    database_replica_retry_seconds: float = 30
+    auth_cache_ttl_seconds: int = 60
+    auth_cache_max_size: int = 10000
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_queue_size: int = 64
+    # public posts this recent are served from the feed table
+    feed_window_days: int = 30
+    # adds a Server-Timing header with the request's DB and total time
+    server_timing: bool = False
 
-
-settings = Settings()
+    @model_validator(mode="after")
+    def check_async_database(self):
+        if (
+            self.database_async
+            and self.database_url
+            and not self.database_url.startswith("postgresql")
+        ):
+            raise ValueError("database_async needs a Postgres database_url")
+        return self
 
 
-print(settings.database_password)
+settings = Settings()
@@ -0,0 +1,79 @@
+from datetime import date
+from sqlalchemy import Integer, String, cast, literal, null, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from . import models
+
+# metric tables (weights/calories/steps) hold one row per user per day
+CONFLICT_COLUMNS = ["owner_id", "date"]
+
+
+def insert_for(db: Session, model):
+    # the generic insert() has no ON CONFLICT support, use the dialect's own
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)
+
+
+def upsert_data(db: Session, model, rows: list[dict], overwrite: bool = False):
+    """Writes rows in a single INSERT ... ON CONFLICT statement.
+
+    Rows whose (owner_id, date) already exists are skipped, or have their
+    datapoint replaced when overwrite is set. Returns the dates written.
+    """
+    stmt = insert_for(db, model).values(rows)
+
+    if overwrite:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=CONFLICT_COLUMNS,
+            set_={"datapoint": stmt.excluded.datapoint},
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=CONFLICT_COLUMNS)
+
+    return db.scalars(stmt.returning(model.date)).all()
+
+
+# name used in exports and combined payloads for each metric table
+METRIC_MODELS = {
+    "weight": models.Weight,
+    "calories": models.Calorie,
+    "steps": models.Step,
+    "exercise": models.Exercise,
+}
+
+
+def metric_rows(
+    metric: str, owner_id: int, start: date | None = None, end: date | None = None
+):
+    """Plain column select of one metric table, oldest first.
+
+    Every metric table comes out with the same columns (exercise stores its
+    datapoint as weight) so the selects can be streamed one after another
+    or combined with UNION ALL.
+    """
+    model = METRIC_MODELS[metric]
+    if model is models.Exercise:
+        datapoint, name, reps = model.weight, model.name, model.reps
+    else:
+        datapoint, name, reps = (
+            model.datapoint,
+            cast(null(), String),
+            cast(null(), Integer),
+        )
+
+    query = select(
+        literal(metric).label("metric"),
+        model.date,
+        datapoint.label("datapoint"),
+        name.label("name"),
+        reps.label("reps"),
+        model.created_at,
+    ).where(model.owner_id == owner_id)
+
+    if start:
+        query = query.where(model.date >= start)
+    if end:
+        query = query.where(model.date <= end)
+
+    return query.order_by(model.date, model.id)
@@ -1,20 +1,256 @@
-from sqlalchemy import create_engine
+import itertools
+import math
+import threading
+import time
+from fastapi import Request
+from sqlalchemy import Engine, create_engine, event, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.datastructures import MutableHeaders
+from .cache import TTLCache
 from .config import settings
+from .pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
 
-SQLALCHEMY_DATABASE_URL = f"postgresql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}"
+SQLALCHEMY_DATABASE_URL = (
+    settings.database_url
+    or f"postgresql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}"
+)
+# the same database through asyncpg, settings rule out async on SQLite
+ASYNC_SQLALCHEMY_DATABASE_URL = make_url(SQLALCHEMY_DATABASE_URL).set(
+    drivername="postgresql+asyncpg"
+)
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+pool_options = {
+    "pool_size": settings.database_pool_size,
+    "max_overflow": settings.database_max_overflow,
+    "pool_timeout": settings.database_pool_timeout,
+    "pool_recycle": settings.database_pool_recycle,
+    "pool_pre_ping": settings.database_pool_pre_ping,
+}
+
+# engines are created on first use rather than at import, so importing the
+# app (workers, tests, scripts) doesn't load a driver or touch the database
+engine = None
+async_engine = None
+replica_engines = None
+engine_lock = threading.Lock()
+
+# replica engine -> time it may be tried again after failing
+replicas_down = {}
+next_replica = itertools.count()
+
+# users who wrote within database_read_your_writes_seconds, on this worker.
+# Other workers learn of the write from the cookie ReadYourWritesMiddleware
+# sends back.
+recent_writers = TTLCache(settings.database_recent_writers_max_size)
+READ_YOUR_WRITES_COOKIE = "primary_reads_until"
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+
+def get_engine() -> Engine:
+    global engine
+
+    if engine is None:
+        with engine_lock:
+            if engine is None:
+                new_engine = create_engine(
+                    SQLALCHEMY_DATABASE_URL,
+                    poolclass=InstrumentedQueuePool,
+                    **pool_options,
+                )
+                # bind before publishing, callers skip the lock once it's set
+                SessionLocal.configure(bind=new_engine)
+                engine = new_engine
+
+    return engine
+
+
+def get_async_engine() -> AsyncEngine | None:
+    """The asyncpg engine, None unless the async routes are enabled."""
+    global async_engine
+
+    if not settings.database_async:
+        return None
+
+    if async_engine is None:
+        with engine_lock:
+            if async_engine is None:
+                new_engine = create_async_engine(
+                    ASYNC_SQLALCHEMY_DATABASE_URL,
+                    poolclass=InstrumentedAsyncQueuePool,
+                    **pool_options,
+                )
+                AsyncSessionLocal.configure(bind=new_engine)
+                async_engine = new_engine
+
+    return async_engine
+
+
+def get_replica_engines() -> list[Engine]:
+    global replica_engines
+
+    if replica_engines is None:
+        with engine_lock:
+            if replica_engines is None:
+                new_engines = [
+                    create_engine(url, poolclass=InstrumentedQueuePool, **pool_options)
+                    for url in settings.database_replica_urls
+                ]
+                for replica in new_engines:
+                    event.listen(replica, "handle_error", mark_replica_down)
+                replica_engines = new_engines
+
+    return replica_engines
+
+
+def mark_replica_down(context):
+    # lost or refused connections, not errors in the statement itself
+    if context.is_disconnect or context.connection is None:
+        replicas_down[context.engine] = (
+            time.monotonic() + settings.database_replica_retry_seconds
+        )
+
+
+def note_user(request: Request, user_id: int):
+    """Records who made the request, for routing its reads.
+
+    Requests that can write mark the user as a recent writer, whose reads
+    then stay on the primary for database_read_your_writes_seconds.
+    """
+    request.state.user_id = user_id
+    if request.method not in ("GET", "HEAD", "OPTIONS"):
+        until = time.time() + settings.database_read_your_writes_seconds
+        recent_writers.set(user_id, True, expires_at=until)
+        request.state.primary_reads_until = until
+
+
+def wrote_recently(request: Request) -> bool:
+    user_id = getattr(request.state, "user_id", None)
+    if user_id is None:
+        return False
+    if recent_writers.get(user_id):
+        return True
+
+    # "<user id>:<unix time>", only honoured for the same user and no
+    # further ahead than a write could have set it
+    cookie_user, _, until = request.cookies.get(READ_YOUR_WRITES_COOKIE, "").partition(
+        ":"
+    )
+    try:
+        until = float(until)
+    except ValueError:
+        return False
+    now = time.time()
+    return (
+        cookie_user == str(user_id)
+        and now < until <= now + settings.database_read_your_writes_seconds
+    )
+
+
+def get_read_engine(request: Request | None = None) -> Engine:
+    """A replica round robin, or the primary if none are configured or up."""
+    if request is not None and wrote_recently(request):
+        return get_engine()
+
+    now = time.monotonic()
+    replicas = [
+        replica
+        for replica in get_replica_engines()
+        if replicas_down.get(replica, 0) <= now
+    ]
+    if not replicas:
+        return get_engine()
+
+    return replicas[next(next_replica) % len(replicas)]
+
+
+class ReadYourWritesMiddleware:
+    """Sends users who wrote a cookie keeping their reads on the primary.
+
+    recent_writers only covers the worker that handled the write, the
+    cookie brings the same routing to the user's next request wherever it
+    lands. Nothing is sent without replicas.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def send_with_cookie(message):
+            # state is the dict behind request.state, filled in by note_user
+            until = scope.get("state", {}).get("primary_reads_until")
+            if (
+                message["type"] == "http.response.start"
+                and until is not None
+                and get_replica_engines()
+            ):
+                user_id = scope["state"]["user_id"]
+                max_age = math.ceil(settings.database_read_your_writes_seconds)
+                MutableHeaders(scope=message).append(
+                    "Set-Cookie",
+                    f"{READ_YOUR_WRITES_COOKIE}={user_id}:{until:.3f}; "
+                    f"Max-Age={max_age}; Path=/; HttpOnly; SameSite=lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+class ReadSession(Session):
+    """Session whose queries go to get_read_engine.
+
+    The engine is picked on the first query rather than when the session
+    is created, by then the route's dependencies have identified the user.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if "engine" not in self.info:
+            self.info["engine"] = get_read_engine(self.info.get("request"))
+        return self.info["engine"]
+
+
+ReadSessionLocal = sessionmaker(class_=ReadSession, autocommit=False, autoflush=False)
+
+
+async def dispose_engines():
+    # closes pooled connections, the engines reconnect if used again
+    if engine is not None:
+        engine.dispose()
+    for replica in replica_engines or []:
+        replica.dispose()
+    if async_engine is not None:
+        await async_engine.dispose()
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
 def get_db():
+    get_engine()
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def get_read_db(request: Request):
+    """A session for routes that only read, see ReadSession."""
+    db = ReadSessionLocal(info={"request": request})
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
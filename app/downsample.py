@@ -0,0 +1,43 @@
+from typing import Callable, Sequence
+
+# most points a series route hands to a chart
+MAX_POINTS = 2000
+
+
+def lttb(points: Sequence, max_points: int, x: Callable, y: Callable) -> list:
+    """Largest Triangle Three Buckets downsampling of a series sorted by x.
+
+    Keeps the first and last points and, from each of max_points - 2 equal
+    buckets in between, the point forming the largest triangle with the
+    point kept before it and the average of the next bucket. Peaks and
+    dips survive, unlike taking every nth point or bucket averages.
+    """
+    count = len(points)
+    if max_points >= count or max_points < 3:
+        return list(points)
+
+    xs = [x(point) for point in points]
+    ys = [y(point) for point in points]
+    bucket_size = (count - 2) / (max_points - 2)
+
+    kept = [0]
+    for bucket in range(max_points - 2):
+        next_start = int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, count)
+        next_x = sum(xs[next_start:next_end]) / (next_end - next_start)
+        next_y = sum(ys[next_start:next_end]) / (next_end - next_start)
+
+        previous = kept[-1]
+        best, best_area = None, -1.0
+        for i in range(int(bucket * bucket_size) + 1, next_start):
+            # twice the triangle's area, only the comparison matters
+            area = abs(
+                (xs[previous] - next_x) * (ys[i] - ys[previous])
+                - (xs[previous] - xs[i]) * (next_y - ys[previous])
+            )
+            if area > best_area:
+                best, best_area = i, area
+        kept.append(best)
+
+    kept.append(count - 1)
+    return [points[i] for i in kept]
@@ -0,0 +1,117 @@
+import csv
+import io
+import json
+from datetime import date
+from sqlalchemy.orm import Session
+from .crud import METRIC_MODELS, metric_rows
+
+COLUMNS = ["metric", "date", "datapoint", "name", "reps", "created_at"]
+
+# rows per server side cursor fetch, and per chunk sent to the client
+BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def row_batches(bind, owner_id: int):
+    """Yields every metric row of a user in batches of BATCH_SIZE.
+
+    The tables are read one after another through server side cursors, so
+    memory use doesn't depend on the size of the history. The session is
+    opened here rather than taken from the request, because the response
+    body is only produced after the request's dependencies are closed.
+    """
+    with Session(bind) as db:
+        for metric in METRIC_MODELS:
+            result = db.execute(
+                metric_rows(metric, owner_id),
+                execution_options={"yield_per": BATCH_SIZE},
+            )
+            for partition in result.partitions():
+                yield partition
+
+
+def isoformat(value):
+    # dates and timestamps as the JSON API writes them, with the T separator
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def ndjson_chunks(batches):
+    for batch in batches:
+        yield "".join(
+            json.dumps(row._asdict(), default=isoformat) + "\n" for row in batch
+        ).encode()
+
+
+def csv_chunks(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+
+    for batch in batches:
+        writer.writerows([isoformat(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class ChunkSink(io.RawIOBase):
+    """Write only file that hands back what was written since the last take."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def parquet_chunks(batches):
+    # optional dependency, the router checks it is installed before streaming
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [
+            ("metric", pa.string()),
+            ("date", pa.date32()),
+            ("datapoint", pa.float64()),
+            ("name", pa.string()),
+            ("reps", pa.int64()),
+            ("created_at", pa.timestamp("us", tz="UTC")),
+        ]
+    )
+
+    sink = ChunkSink()
+    # one row group per batch, each is sent as soon as it is written
+    with pq.ParquetWriter(sink, schema) as writer:
+        for batch in batches:
+            writer.write_table(
+                pa.Table.from_pylist([row._asdict() for row in batch], schema=schema)
+            )
+            yield sink.take()
+
+    yield sink.take()
+
+
+ENCODERS = {"ndjson": ndjson_chunks, "csv": csv_chunks, "parquet": parquet_chunks}
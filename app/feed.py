@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, insert, select, tuple_, union_all
+from sqlalchemy.orm import Session
+from . import models
+from .cache import TTLCache
+from .config import settings
+from .crud import insert_for
+from .database import get_engine
+from .pagination import decode_cursor
+
+logger = logging.getLogger(__name__)
+
+FEED_KEY = [models.Post.created_at, models.Post.id]
+
+# how often each worker drops entries that have aged out of the window
+TRIM_INTERVAL_SECONDS = 3600
+
+# feed_state is read once a minute per worker, so a rebuild_feed run from
+# a deploy step is picked up without restarting
+FEED_STATE_ID = 1
+FEED_STATE_TTL_SECONDS = 60
+feed_state_cache = TTLCache(1)
+feed_state_stmt = select(models.FeedState.complete_since).where(
+    models.FeedState.id == FEED_STATE_ID
+)
+
+
+def horizon() -> datetime:
+    """Public posts created after this are all in the feed, once it has
+    been rebuilt."""
+    return datetime.now(timezone.utc) - timedelta(days=settings.feed_window_days)
+
+
+def cached_feed_state():
+    """(complete_since,) as last read from feed_state, or None to read it."""
+    return feed_state_cache.get(FEED_STATE_ID)
+
+
+def cache_feed_state(complete_since: datetime | None) -> datetime | None:
+    if complete_since is not None and complete_since.tzinfo is None:
+        # SQLite hands timestamps back naive
+        complete_since = complete_since.replace(tzinfo=timezone.utc)
+    feed_state_cache.set(
+        FEED_STATE_ID,
+        (complete_since,),
+        expires_at=time.time() + FEED_STATE_TTL_SECONDS,
+    )
+    return complete_since
+
+
+def feed_page_stmt(user_id: int, cursor: str | None, limit: int, since: datetime):
+    """Ids of the user's next feed page of posts created after since.
+
+    The page merges the feed's public posts with the user's own private
+    posts, both read newest first from narrow indexes, without touching
+    the posts the user can't see.
+    """
+    public = select(
+        models.FeedPost.post_id.label("id"), models.FeedPost.created_at
+    ).where(models.FeedPost.created_at > since)
+    own = select(models.Post.id, models.Post.created_at).where(
+        models.Post.owner_id == user_id,
+        models.Post.private == True,
+        models.Post.created_at > since,
+    )
+
+    if cursor:
+        values = tuple_(*decode_cursor(cursor, FEED_KEY))
+        public = public.where(
+            tuple_(models.FeedPost.created_at, models.FeedPost.post_id) < values
+        )
+        own = own.where(tuple_(*FEED_KEY) < values)
+
+    public = public.order_by(
+        models.FeedPost.created_at.desc(), models.FeedPost.post_id.desc()
+    )
+    own = own.order_by(*(column.desc() for column in FEED_KEY))
+    # each side limited on its own first, wrapped so SQLite takes the union
+    page = union_all(
+        *(select(side.limit(limit).subquery()) for side in (public, own))
+    ).subquery()
+    return (
+        select(page.c.id)
+        .order_by(page.c.created_at.desc(), page.c.id.desc())
+        .limit(limit)
+    )
+
+
+def feed_since(complete_since: datetime | None) -> datetime | None:
+    # never rebuilt, posts from before the feed existed may be missing
+    if complete_since is None:
+        return None
+    return max(horizon(), complete_since)
+
+
+def feed_page(db: Session, user_id: int, cursor: str | None, limit: int):
+    """Ids of the user's next feed page, newest first, or None if the page
+    reaches back past what the feed holds."""
+    state = cached_feed_state()
+    since = feed_since(
+        state[0] if state else cache_feed_state(db.scalar(feed_state_stmt))
+    )
+    if since is None:
+        return None
+
+    ids = db.scalars(feed_page_stmt(user_id, cursor, limit, since)).all()
+    return ids if len(ids) == limit else None
+
+
+async def feed_page_async(db, user_id: int, cursor: str | None, limit: int):
+    """feed_page on an AsyncSession."""
+    state = cached_feed_state()
+    since = feed_since(
+        state[0] if state else cache_feed_state(await db.scalar(feed_state_stmt))
+    )
+    if since is None:
+        return None
+
+    ids = (await db.scalars(feed_page_stmt(user_id, cursor, limit, since))).all()
+    return ids if len(ids) == limit else None
+
+
+def feed_entry(db: Session, post):
+    """Statement adding a public post to the feed, or removing a private one.
+
+    Run it in the transaction that wrote the post, deleted posts leave the
+    feed through the foreign key.
+    """
+    if post.private:
+        return delete(models.FeedPost).where(models.FeedPost.post_id == post.id)
+
+    return (
+        insert_for(db, models.FeedPost)
+        .values(post_id=post.id, created_at=post.created_at)
+        .on_conflict_do_nothing(index_elements=["post_id"])
+    )
+
+
+def trim_feed():
+    # aged out entries are already skipped by reads, this only keeps the
+    # table small
+    with get_engine().begin() as conn:
+        conn.execute(
+            delete(models.FeedPost).where(models.FeedPost.created_at <= horizon())
+        )
+
+
+async def trim_feed_periodically():
+    while True:
+        await asyncio.sleep(TRIM_INTERVAL_SECONDS)
+        try:
+            await run_in_threadpool(trim_feed)
+        except Exception:
+            # the database being away for a while shouldn't end the loop
+            logger.exception("Trimming the feed failed")
+
+
+def rebuild_feed(conn):
+    """Refills the feed and marks it complete from the current horizon.
+
+    Until it has run the post listing takes the full query, so run it as
+    a deploy step when the feed tables are first created and after raising
+    feed_window_days, and for posts written around the routes.
+    """
+    since = horizon()
+    conn.execute(delete(models.FeedPost))
+    conn.execute(
+        insert(models.FeedPost).from_select(
+            ["post_id", "created_at"],
+            select(models.Post.id, models.Post.created_at).where(
+                models.Post.private == False, models.Post.created_at > since
+            ),
+        )
+    )
+    conn.execute(delete(models.FeedState))
+    conn.execute(
+        insert(models.FeedState).values(id=FEED_STATE_ID, complete_since=since)
+    )
+
+
+if __name__ == "__main__":
+    # python -m app.feed
+    with get_engine().begin() as conn:
+        rebuild_feed(conn)
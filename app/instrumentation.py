@@ -0,0 +1,209 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from sqlalchemy import Engine, event
+from starlette.datastructures import MutableHeaders
+from .config import settings
+
+# upper bounds of the histogram buckets, +Inf is implied
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+QUERY_BUCKETS = [0, 1, 2, 3, 5, 10, 20, 50, 100]
+
+# requests that matched no route share a label, so scans of random paths
+# can't grow the series without bound
+UNMATCHED_ROUTE = "unmatched"
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+
+
+# set per request by MetricsMiddleware. Sync routes run on a copy of the
+# context in the thread pool, which still points at the same object.
+current_request: ContextVar[RequestStats | None] = ContextVar(
+    "current_request", default=None
+)
+
+
+class Histogram:
+    def __init__(self, buckets: list[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self, name: str, labels: str):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ["+Inf"], self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f"{name}_sum{{{labels}}} {self.sum}"
+        yield f"{name}_count{{{labels}}} {cumulative}"
+
+
+class RequestMetrics:
+    """Per route request counts and latency, DB time and query histograms,
+    plus the hit and miss counters of the caches tracked here."""
+
+    def __init__(self):
+        self.requests = {}
+        self.latency = {}
+        self.db_time = {}
+        self.queries = {}
+        self.caches = {}
+        self._lock = threading.Lock()
+
+    def track_cache(self, name: str, cache):
+        """Exports a TTLCache's size, hits and misses under name."""
+        self.caches[name] = cache
+
+    def record(
+        self, method: str, route: str, status: int, seconds: float, stats: RequestStats
+    ):
+        key = (method, route)
+        with self._lock:
+            self.requests[key + (status,)] = self.requests.get(key + (status,), 0) + 1
+            if key not in self.latency:
+                self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.db_time[key] = Histogram(LATENCY_BUCKETS)
+                self.queries[key] = Histogram(QUERY_BUCKETS)
+            self.latency[key].observe(seconds)
+            self.db_time[key].observe(stats.db_seconds)
+            self.queries[key].observe(stats.queries)
+
+    def clear(self):
+        with self._lock:
+            self.requests.clear()
+            self.latency.clear()
+            self.db_time.clear()
+            self.queries.clear()
+
+    def render(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP http_requests_total Requests handled, by route and status.",
+            "# TYPE http_requests_total counter",
+        ]
+        with self._lock:
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(
+                    f'http_requests_total{{method="{method}",route="{route}",'
+                    f'status="{status}"}} {count}'
+                )
+
+            for name, help, histograms in [
+                (
+                    "http_request_duration_seconds",
+                    "Time from receiving a request to the end of its response.",
+                    self.latency,
+                ),
+                (
+                    "http_request_db_seconds",
+                    "Time spent executing SQL per request.",
+                    self.db_time,
+                ),
+                (
+                    "http_request_queries",
+                    "SQL statements executed per request.",
+                    self.queries,
+                ),
+            ]:
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} histogram"]
+                for (method, route), histogram in sorted(histograms.items()):
+                    lines.extend(
+                        histogram.samples(name, f'method="{method}",route="{route}"')
+                    )
+
+        cache_stats = {name: cache.stats() for name, cache in self.caches.items()}
+        for stat, type, help in [
+            ("hits", "counter", "Lookups answered from the cache."),
+            ("misses", "counter", "Lookups missing or expired in the cache."),
+            ("size", "gauge", "Entries held by the cache."),
+        ]:
+            name = f"cache_{stat}_total" if type == "counter" else f"cache_{stat}"
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {type}"]
+            for cache, stats in sorted(cache_stats.items()):
+                lines.append(f'{name}{{cache="{cache}"}} {stats[stat]}')
+
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def record_query(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info["query_started"].pop()
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += seconds
+
+
+@event.listens_for(Engine, "handle_error")
+def discard_query_timer(context):
+    # failed statements never reach after_cursor_execute
+    if context.connection is not None:
+        started = context.connection.info.get("query_started")
+        if started:
+            started.pop()
+
+
+class MetricsMiddleware:
+    """Times every request and counts the SQL it runs.
+
+    A plain ASGI middleware, so streaming responses are timed to their last
+    chunk. With settings.server_timing the DB and total time so far are
+    also sent in a Server-Timing header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.server_timing:
+                    db = stats.db_seconds * 1000
+                    total = (time.perf_counter() - started) * 1000
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing",
+                        f'db;dur={db:.2f};desc="{stats.queries} queries", '
+                        f"app;dur={total:.2f}",
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request.reset(token)
+            route = scope.get("route")
+            request_metrics.record(
+                scope["method"],
+                route.path if route else UNMATCHED_ROUTE,
+                status,
+                time.perf_counter() - started,
+                stats,
+            )
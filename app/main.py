@@ -1,19 +1,77 @@
-from fastapi import FastAPI
-from . import models
-from .database import engine
-from .routers import auth, user, data, post
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from fastapi import APIRouter, FastAPI
+from . import feed, models, utils
+from .config import settings
+from .database import ReadYourWritesMiddleware, dispose_engines, get_engine
+from .instrumentation import MetricsMiddleware
+from .serialization import DefaultResponse
+from .routers import auth, user, data, post, vote, metrics
+from .routers.async_routers import (
+    auth as async_auth,
+    user as async_user,
+    post as async_post,
+    weight as async_weight,
+)
 
 
-models.Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # schema changes are a deploy step, every worker checking the tables on
+    # boot is opt in
+    if settings.database_schema_sync:
+        models.Base.metadata.create_all(bind=get_engine())
+    feed_trimmer = asyncio.create_task(feed.trim_feed_periodically())
 
+    yield
 
-app = FastAPI()
+    feed_trimmer.cancel()
+    # finished before the engines go, so a trim can't run on a disposed pool
+    with suppress(asyncio.CancelledError):
+        await feed_trimmer
+    utils.shutdown_password_executor()
+    await dispose_engines()
+
+
+app = FastAPI(default_response_class=DefaultResponse, lifespan=lifespan)
+
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 
 app.include_router(auth.router)
 app.include_router(user.router)
 app.include_router(data.router)
 app.include_router(post.router)
+app.include_router(vote.router)
+app.include_router(metrics.router)
+
+
+def use_async_routes(app: FastAPI, routers: list[APIRouter]):
+    """Swaps routes for their async versions in place.
+
+    Routes are matched on path and methods, so routes without an async
+    version keep working on the sync session and the matching order is
+    unchanged.
+    """
+    async_routes = {
+        (route.path, frozenset(route.methods)): route
+        for router in routers
+        for route in router.routes
+    }
+    app.router.routes = [
+        async_routes.get(
+            (route.path, frozenset(getattr(route, "methods", None) or ())), route
+        )
+        for route in app.router.routes
+    ]
+
+
+if settings.database_async:
+    use_async_routes(
+        app,
+        [async_auth.router, async_user.router, async_post.router, async_weight.router],
+    )
 
 
 @app.get("/")
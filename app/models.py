@@ -1,8 +1,27 @@
-from sqlalchemy import Column, Integer, Float, String, Boolean, ForeignKey, Date
+from sqlalchemy import (
+    Column,
+    Integer,
+    Float,
+    String,
+    Boolean,
+    ForeignKey,
+    Date,
+    Index,
+    UniqueConstraint,
+)
+from sqlalchemy.dialects import postgresql  # registers the full text functions
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql.expression import text
+from sqlalchemy.sql.expression import false, func, text
 from sqlalchemy.sql.sqltypes import TIMESTAMP
+from .config import settings
 from .database import Base
+from .partitions import partition_options
+
+# with database_partition_metrics the metric tables are range partitioned by
+# date, one partition per year created as rows arrive (app.partitions).
+# Postgres wants the partition key in every unique constraint, so date joins
+# the primary key, while the mappers keep identifying rows by id alone.
+PARTITIONED = settings.database_partition_metrics
 
 
 class User(Base):
@@ -13,19 +32,34 @@ class User(Base):
     email = Column(String, nullable=False, unique=True)
     password = Column(String, nullable=False)
     created_at = Column(
-        TIMESTAMP(timezone=True), nullable=False, server_default=text("now()")
+        TIMESTAMP(timezone=True), nullable=False, server_default=func.now()
     )
 
 
 class Post(Base):
     __tablename__ = "posts"
+    __table_args__ = (
+        # newest first feed ordering, also the keyset pagination key
+        Index("ix_posts_created_at_id", "created_at", "id"),
+        # a user's own posts in the same order
+        Index("ix_posts_owner_id_created_at_id", "owner_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, nullable=False)
     title = Column(String, nullable=False)
     content = Column(String, nullable=False)
-    private = Column(Boolean, server_default="False", nullable=False)
+    private = Column(Boolean, server_default=false(), nullable=False)
+    # kept in step with the votes table by the vote router
+    votes_count = Column(Integer, server_default="0", nullable=False)
     created_at = Column(
-        TIMESTAMP(timezone=True), nullable=False, server_default=text("now()")
+        TIMESTAMP(timezone=True), nullable=False, server_default=func.now()
+    )
+    # row version for conditional GETs, bumped by every UPDATE (votes too)
+    updated_at = Column(
+        TIMESTAMP(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now(),
     )
     owner_id = Column(
         Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
@@ -34,6 +68,40 @@ class Post(Base):
     owner = relationship("User")
 
 
+# full text search document for posts. Queries have to use this exact
+# expression (config and separator inlined, not bound) to hit the GIN index
+post_search_vector = func.to_tsvector(
+    text("'english'::regconfig"), Post.title.concat(text("' '")).concat(Post.content)
+)
+
+Index("ix_posts_search_vector", post_search_vector, postgresql_using="gin").ddl_if(
+    dialect="postgresql"
+)
+
+
+class FeedPost(Base):
+    """The public posts of the last settings.feed_window_days, see app.feed."""
+
+    __tablename__ = "feed_posts"
+    __table_args__ = (
+        Index("ix_feed_posts_created_at_post_id", "created_at", "post_id"),
+    )
+
+    post_id = Column(
+        Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True
+    )
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False)
+
+
+class FeedState(Base):
+    """One row, how far back feed_posts is known to be complete."""
+
+    __tablename__ = "feed_state"
+
+    id = Column(Integer, primary_key=True)
+    complete_since = Column(TIMESTAMP(timezone=True), nullable=False)
+
+
 class Vote(Base):
     __tablename__ = "votes"
 
@@ -47,12 +115,16 @@ class Vote(Base):
 
 class Weight(Base):
     __tablename__ = "weights"
+    __table_args__ = (
+        UniqueConstraint("owner_id", "date", name="uq_weights_owner_id_date"),
+        partition_options(),
+    )
 
-    id = Column(Integer, primary_key=True, nullable=False)
+    id = Column(Integer, primary_key=True, nullable=False, autoincrement=True)
     datapoint = Column(Integer, nullable=False)
-    date = Column(Date, nullable=False)
+    date = Column(Date, nullable=False, primary_key=PARTITIONED)
     created_at = Column(
-        TIMESTAMP(timezone=True), nullable=False, server_default=text("now()")
+        TIMESTAMP(timezone=True), nullable=False, server_default=func.now()
     )
     owner_id = Column(
         Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
@@ -60,15 +132,21 @@ class Weight(Base):
 
     owner = relationship("User")
 
+    __mapper_args__ = {"primary_key": [id]}
+
 
 class Calorie(Base):
     __tablename__ = "calories"
+    __table_args__ = (
+        UniqueConstraint("owner_id", "date", name="uq_calories_owner_id_date"),
+        partition_options(),
+    )
 
-    id = Column(Integer, primary_key=True, nullable=False)
+    id = Column(Integer, primary_key=True, nullable=False, autoincrement=True)
     datapoint = Column(Float, nullable=False)
-    date = Column(Date, nullable=False)
+    date = Column(Date, nullable=False, primary_key=PARTITIONED)
     created_at = Column(
-        TIMESTAMP(timezone=True), nullable=False, server_default=text("now()")
+        TIMESTAMP(timezone=True), nullable=False, server_default=func.now()
     )
     owner_id = Column(
         Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
@@ -76,15 +154,21 @@ class Calorie(Base):
 
     owner = relationship("User")
 
+    __mapper_args__ = {"primary_key": [id]}
+
 
 class Step(Base):
     __tablename__ = "steps"
+    __table_args__ = (
+        UniqueConstraint("owner_id", "date", name="uq_steps_owner_id_date"),
+        partition_options(),
+    )
 
-    id = Column(Integer, primary_key=True, nullable=False)
+    id = Column(Integer, primary_key=True, nullable=False, autoincrement=True)
     datapoint = Column(Float, nullable=False)
-    date = Column(Date, nullable=False)
+    date = Column(Date, nullable=False, primary_key=PARTITIONED)
     created_at = Column(
-        TIMESTAMP(timezone=True), nullable=False, server_default=text("now()")
+        TIMESTAMP(timezone=True), nullable=False, server_default=func.now()
     )
     owner_id = Column(
         Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
@@ -92,20 +176,87 @@ class Step(Base):
 
     owner = relationship("User")
 
+    __mapper_args__ = {"primary_key": [id]}
+
 
 class Exercise(Base):
     __tablename__ = "exercise"
+    # several sets of an exercise can be logged on the same day
+    __table_args__ = (
+        Index("ix_exercise_owner_id_date", "owner_id", "date"),
+        # personal records are recomputed per exercise name
+        Index("ix_exercise_owner_id_name", "owner_id", "name"),
+        partition_options(),
+    )
 
-    id = Column(Integer, primary_key=True, nullable=False)
+    id = Column(Integer, primary_key=True, nullable=False, autoincrement=True)
     name = Column(String, nullable=False)
     weight = Column(Float, nullable=False)
     reps = Column(Integer, nullable=False)
-    date = Column(Date, nullable=False)
+    date = Column(Date, nullable=False, primary_key=PARTITIONED)
     created_at = Column(
-        TIMESTAMP(timezone=True), nullable=False, server_default=text("now()")
+        TIMESTAMP(timezone=True), nullable=False, server_default=func.now()
     )
     owner_id = Column(
         Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
     )
 
     owner = relationship("User")
+
+    __mapper_args__ = {"primary_key": [id]}
+
+
+class DailySummary(Base):
+    """Every metric of a user's day in one row, for day and week views.
+
+    Kept in step with the metric tables by the routes that write them, in
+    the same transaction (app.summary).
+    """
+
+    __tablename__ = "daily_summary"
+
+    owner_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    date = Column(Date, primary_key=True)
+    weight = Column(Integer)
+    calories = Column(Float)
+    steps = Column(Float)
+    exercise_sets = Column(Integer, server_default="0", nullable=False)
+    # sum of weight * reps over the day's sets
+    exercise_volume = Column(Float, server_default="0", nullable=False)
+
+
+class ExerciseRecord(Base):
+    """A user's personal records for one exercise, see app.records."""
+
+    __tablename__ = "exercise_records"
+
+    owner_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    name = Column(String, primary_key=True)
+    # estimated one rep max of the best set, by the Epley formula
+    e1rm = Column(Float, nullable=False)
+    # best estimate by the Brzycki formula, which only holds below 37 reps
+    e1rm_brzycki = Column(Float)
+    best_weight = Column(Float, nullable=False)
+    best_reps = Column(Integer, nullable=False)
+    best_date = Column(Date, nullable=False)
+    max_weight = Column(Float, nullable=False)
+    best_week = Column(Date, nullable=False)
+    best_week_volume = Column(Float, nullable=False)
+
+
+class ExerciseVolume(Base):
+    """Weight * reps summed over a week (starting Monday) per exercise."""
+
+    __tablename__ = "exercise_volume"
+
+    owner_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    name = Column(String, primary_key=True)
+    week = Column(Date, primary_key=True)
+    volume = Column(Float, nullable=False)
+    sets = Column(Integer, nullable=False)
@@ -1,10 +1,15 @@
+import time
 from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone
 from . import schemas, database, models
-from fastapi import Depends, status, HTTPException
+from .cache import TTLCache
+from fastapi import Depends, Request, status, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
 from .config import settings
+from .instrumentation import request_metrics
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
@@ -13,6 +18,12 @@ SECRET_KEY = settings.secret_key
 ALGORITHM = settings.algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 
+# decoded tokens live until the token expires, users for the configured ttl
+token_cache = TTLCache(settings.auth_cache_max_size)
+user_cache = TTLCache(settings.auth_cache_max_size)
+request_metrics.track_cache("token", token_cache)
+request_metrics.track_cache("user", user_cache)
+
 
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
@@ -26,6 +37,10 @@ def create_access_token(data: dict) -> str:
 
 
 def verify_access_token(token: str, credentials_exception) -> schemas.TokenData:
+    token_data = token_cache.get(token)
+    if token_data:
+        return token_data
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=ALGORITHM)
         id: str = payload.get("user_id")
@@ -36,11 +51,48 @@ def verify_access_token(token: str, credentials_exception) -> schemas.TokenData:
     except JWTError:
         raise credentials_exception
 
+    token_cache.set(token, token_data, expires_at=payload["exp"])
+
     return token_data
 
 
+def cache_user(user: models.User | None) -> schemas.UserOut | None:
+    if not user:
+        return None
+
+    cached_user = schemas.UserOut.model_validate(user)
+    user_cache.set(
+        user.id,
+        cached_user,
+        expires_at=time.time() + settings.auth_cache_ttl_seconds,
+    )
+    return cached_user
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def note_changed_user(mapper, connection, target: models.User):
+    object_session(target).info.setdefault("changed_users", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_cached_users(session: Session):
+    # popped once the change is visible, so the next lookup reads the new
+    # row. A request that read the old row just before the commit can still
+    # cache it, for at most auth_cache_ttl_seconds.
+    for user_id in session.info.pop("changed_users", ()):
+        user_cache.pop(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def forget_changed_users(session: Session):
+    session.info.pop("changed_users", None)
+
+
 def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(database.get_db),
 ) -> schemas.UserOut:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -50,6 +102,35 @@ def get_current_user(
 
     token = verify_access_token(token, credentials_exception)
 
-    user = db.query(models.User).filter(models.User.id == token.id).first()
+    user = user_cache.get(token.id) or cache_user(
+        db.query(models.User).filter(models.User.id == token.id).first()
+    )
+
+    if not user:
+        raise credentials_exception
+
+    database.note_user(request, user.id)
+
+    return user
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(database.get_async_db),
+) -> schemas.UserOut:
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=f"Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    token = verify_access_token(token, credentials_exception)
+
+    user = user_cache.get(token.id) or cache_user(
+        await db.scalar(select(models.User).where(models.User.id == token.id))
+    )
+
+    if not user:
+        raise credentials_exception
 
     return user
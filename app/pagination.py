@@ -0,0 +1,54 @@
+import base64
+import json
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values) -> str:
+    payload = json.dumps([str(value) for value in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def parse_value(column, value: str):
+    # dates and timestamps round trip through isoformat, ids through int
+    python_type = column.type.python_type
+    if hasattr(python_type, "fromisoformat"):
+        return python_type.fromisoformat(value)
+    return python_type(value)
+
+
+def decode_cursor(cursor: str, columns) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if len(values) != len(columns):
+            raise ValueError
+        return [parse_value(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid cursor"
+        )
+
+
+def split_page(rows, limit: int):
+    """(page, has_more) of rows fetched with limit + 1.
+
+    The extra row only says whether another page follows, so the cursor
+    isn't sent when the rows run out exactly at the end of a page.
+    """
+    return rows[:limit], len(rows) > limit
+
+
+def keyset_page(query, columns, cursor: str | None, limit: int):
+    """Orders query newest first on columns and continues after cursor.
+
+    The row comparison lets Postgres seek straight to the cursor on an index
+    over columns, so every page costs the same however deep it is. Works on
+    both legacy Query objects and select() statements.
+    """
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        query = query.where(tuple_(*columns) < tuple_(*values))
+
+    return query.order_by(*(column.desc() for column in columns)).limit(limit)
@@ -0,0 +1,98 @@
+import threading
+from datetime import date
+from sqlalchemy import Engine, Table, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from .config import settings
+
+# (table, year) partitions known to exist, so the check is a set lookup
+# after the first write of each year. Entries go stale if a partition is
+# dropped or detached, write_partitioned clears them when a write fails.
+known_partitions = set()
+known_partitions_lock = threading.Lock()
+
+
+def partition_options() -> dict:
+    """Table kwargs for a metric table, range partitioned by date when
+    settings.database_partition_metrics is on."""
+    if not settings.database_partition_metrics:
+        return {}
+    return {"postgresql_partition_by": "RANGE (date)"}
+
+
+def partition_name(table: Table, year: int) -> str:
+    return f"{table.name}_y{year}"
+
+
+def ensure_partitions(bind: Engine, table: Table, dates):
+    """Creates the yearly partitions of table that dates fall into.
+
+    Rows for a year without a partition are rejected, so writes call this
+    first. The DDL runs on a connection of its own, committing before the
+    write's transaction, and an advisory lock keeps workers creating the
+    same partition from racing. That connection comes from the same pool
+    while the request's session may hold one, so the first write of a year
+    on each worker needs a spare slot (database_max_overflow covers it).
+    """
+    if not settings.database_partition_metrics or bind.dialect.name != "postgresql":
+        return
+
+    with known_partitions_lock:
+        years = {day.year for day in dates} - {
+            year for name, year in known_partitions if name == table.name
+        }
+    if not years:
+        return
+
+    with bind.begin() as conn:
+        conn.execute(
+            text("SELECT pg_advisory_xact_lock(hashtext(:table))"),
+            {"table": table.name},
+        )
+        for year in sorted(years):
+            conn.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {partition_name(table, year)} "
+                    f"PARTITION OF {table.name} "
+                    f"FOR VALUES FROM ('{date(year, 1, 1)}') TO ('{date(year + 1, 1, 1)}')"
+                )
+            )
+
+    with known_partitions_lock:
+        known_partitions.update((table.name, year) for year in years)
+
+
+def forget_partitions(table: Table):
+    with known_partitions_lock:
+        known_partitions.difference_update(
+            [key for key in known_partitions if key[0] == table.name]
+        )
+
+
+def is_missing_partition(error: DBAPIError) -> bool:
+    # a check_violation, like any CHECK constraint, so the message decides
+    message = str(error.orig)
+    return getattr(error.orig, "pgcode", None) == "23514" and (
+        "no partition of relation" in message
+    )
+
+
+def write_partitioned(db: Session, table: Table, dates, write):
+    """Runs write() once dates have partitions and returns its result.
+
+    A write into a partition dropped or detached since it was cached fails.
+    The table's cache entries are then cleared and the write retried once
+    with the partitions recreated. db is rolled back in between, so it
+    should only have read before write().
+    """
+    dates = list(dates)
+    ensure_partitions(db.get_bind(), table, dates)
+    try:
+        return write()
+    except DBAPIError as error:
+        if not is_missing_partition(error):
+            raise
+        db.rollback()
+        forget_partitions(table)
+        ensure_partitions(db.get_bind(), table, dates)
+        return write()
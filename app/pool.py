@@ -0,0 +1,73 @@
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class CheckoutMetrics:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, wait_seconds: float, timed_out: bool):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.wait_seconds_total += wait_seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+
+
+class CheckoutTimingMixin:
+    """Records how long callers wait for a connection, including timeouts.
+
+    The wait covers queueing for a free connection as well as opening a new
+    one and the pre-ping, which is everything a request is blocked on.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = CheckoutMetrics()
+
+    def connect(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.metrics.record(time.perf_counter() - start, timed_out)
+
+
+class InstrumentedQueuePool(CheckoutTimingMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_status(pool: QueuePool) -> dict:
+    status = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        # negative until the pool has opened `size` connections
+        "overflow": max(pool.overflow(), 0),
+        "timeout_seconds": pool.timeout(),
+    }
+
+    metrics = getattr(pool, "metrics", None)
+    if metrics:
+        status.update(
+            checkouts=metrics.checkouts,
+            timeouts=metrics.timeouts,
+            wait_seconds_total=round(metrics.wait_seconds_total, 6),
+            wait_seconds_max=round(metrics.wait_seconds_max, 6),
+        )
+
+    return status
@@ -0,0 +1,230 @@
+from datetime import date, timedelta
+from sqlalchemy import Date, Float, and_, case, cast, delete, func, insert, literal
+from sqlalchemy import literal_column, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.sqltypes import TIMESTAMP
+from . import models
+from .crud import insert_for
+
+RECORD_KEY = ["owner_id", "name"]
+VOLUME_KEY = ["owner_id", "name", "week"]
+
+# Brzycki divides by 37 - reps and is meaningless from there on
+BRZYCKI_MAX_REPS = 36
+
+
+def epley(weight, reps):
+    """Estimated one rep max of a set, over columns or literals."""
+    return weight * (1 + cast(reps, Float) / 30)
+
+
+def brzycki(weight, reps):
+    return case(
+        (reps <= BRZYCKI_MAX_REPS, weight * 36 / (37 - cast(reps, Float))),
+        else_=None,
+    )
+
+
+def week_of(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def week_start(db: Session, day):
+    """SQL for the Monday starting day's week, matching week_of."""
+    if db.get_bind().dialect.name == "sqlite":
+        return func.date(day, "-6 days", "weekday 1")
+    # inlined rather than bound, so GROUP BY sees the same expression
+    return cast(func.date_trunc(literal_column("'week'"), cast(day, TIMESTAMP)), Date)
+
+
+def add_set(db: Session, owner_id: int, exercise: dict):
+    """Folds one new set into the user's records, without reading history.
+
+    Two upserts: the set's weight * reps is added to its week's volume,
+    then each record is replaced where the set (or the week) beats it.
+    """
+    weight, reps, day = exercise["datapoint"], exercise["reps"], exercise["date"]
+    week = week_of(day)
+
+    volume_stmt = insert_for(db, models.ExerciseVolume).values(
+        owner_id=owner_id,
+        name=exercise["name"],
+        week=week,
+        volume=weight * reps,
+        sets=1,
+    )
+    week_volume = db.scalar(
+        volume_stmt.on_conflict_do_update(
+            index_elements=VOLUME_KEY,
+            set_={
+                "volume": models.ExerciseVolume.volume + volume_stmt.excluded.volume,
+                "sets": models.ExerciseVolume.sets + 1,
+            },
+        ).returning(models.ExerciseVolume.volume)
+    )
+
+    weight, reps = literal(weight, Float), literal(reps)
+    stmt = insert_for(db, models.ExerciseRecord).values(
+        owner_id=owner_id,
+        name=exercise["name"],
+        e1rm=epley(weight, reps),
+        e1rm_brzycki=brzycki(weight, reps),
+        best_weight=weight,
+        best_reps=reps,
+        best_date=day,
+        max_weight=weight,
+        best_week=week,
+        best_week_volume=week_volume,
+    )
+    new, current = stmt.excluded, models.ExerciseRecord.__table__.c
+
+    def keep_best(beaten, *columns) -> dict:
+        return {
+            column: case((beaten, new[column]), else_=current[column])
+            for column in columns
+        }
+
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=RECORD_KEY,
+            set_={
+                **keep_best(
+                    new.e1rm > current.e1rm,
+                    "e1rm",
+                    "best_weight",
+                    "best_reps",
+                    "best_date",
+                ),
+                **keep_best(
+                    current.e1rm_brzycki.is_(None)
+                    | (new.e1rm_brzycki > current.e1rm_brzycki),
+                    "e1rm_brzycki",
+                ),
+                **keep_best(new.max_weight > current.max_weight, "max_weight"),
+                **keep_best(
+                    new.best_week_volume > current.best_week_volume,
+                    "best_week",
+                    "best_week_volume",
+                ),
+            },
+        )
+    )
+
+
+def rebuild_records(db: Session, owner_id: int, names=None):
+    """Recomputes a user's records and weekly volumes from their history.
+
+    For the exercise names given, or all of them. Each table is filled by
+    one set based statement over the user's sets, for edits and deletes
+    that can lower a record and for history written around the routes.
+    """
+    exercise, volume = models.Exercise, models.ExerciseVolume
+
+    def owner_names(model) -> list:
+        filters = [model.owner_id == owner_id]
+        if names is not None:
+            filters.append(model.name.in_(names))
+        return filters
+
+    sets_filter, volume_filter = owner_names(exercise), owner_names(volume)
+
+    db.execute(delete(volume).where(*volume_filter))
+    db.execute(delete(models.ExerciseRecord).where(*owner_names(models.ExerciseRecord)))
+
+    db.execute(
+        insert(volume).from_select(
+            VOLUME_KEY + ["volume", "sets"],
+            select(
+                exercise.owner_id,
+                exercise.name,
+                week_start(db, exercise.date).label("week"),
+                func.sum(exercise.weight * exercise.reps),
+                func.count(),
+            )
+            .where(*sets_filter)
+            .group_by(exercise.owner_id, exercise.name, "week"),
+        )
+    )
+
+    e1rm = epley(exercise.weight, exercise.reps)
+    by_name = {"partition_by": exercise.name}
+    # ties go to the earliest logged set, like add_set
+    ranked_sets = (
+        select(
+            exercise.owner_id,
+            exercise.name,
+            e1rm.label("e1rm"),
+            func.max(brzycki(exercise.weight, exercise.reps))
+            .over(**by_name)
+            .label("e1rm_brzycki"),
+            exercise.weight,
+            exercise.reps,
+            exercise.date,
+            func.max(exercise.weight).over(**by_name).label("max_weight"),
+            func.row_number()
+            .over(order_by=(e1rm.desc(), exercise.id), **by_name)
+            .label("rank"),
+        )
+        .where(*sets_filter)
+        .subquery()
+    )
+    ranked_weeks = (
+        select(
+            volume.name,
+            volume.week,
+            volume.volume,
+            func.row_number()
+            .over(
+                partition_by=volume.name, order_by=(volume.volume.desc(), volume.week)
+            )
+            .label("rank"),
+        )
+        .where(*volume_filter)
+        .subquery()
+    )
+
+    db.execute(
+        insert(models.ExerciseRecord).from_select(
+            RECORD_KEY
+            + [
+                "e1rm",
+                "e1rm_brzycki",
+                "best_weight",
+                "best_reps",
+                "best_date",
+                "max_weight",
+                "best_week",
+                "best_week_volume",
+            ],
+            select(
+                ranked_sets.c.owner_id,
+                ranked_sets.c.name,
+                ranked_sets.c.e1rm,
+                ranked_sets.c.e1rm_brzycki,
+                ranked_sets.c.weight,
+                ranked_sets.c.reps,
+                ranked_sets.c.date,
+                ranked_sets.c.max_weight,
+                ranked_weeks.c.week,
+                ranked_weeks.c.volume,
+            )
+            .join(
+                ranked_weeks,
+                and_(
+                    ranked_weeks.c.name == ranked_sets.c.name, ranked_weeks.c.rank == 1
+                ),
+            )
+            .where(ranked_sets.c.rank == 1),
+        )
+    )
+
+
+def update_records(db: Session, owner_id: int, written: list, removed: list):
+    """on_write hook of the exercise routes."""
+    if removed:
+        rebuild_records(
+            db, owner_id, {exercise["name"] for exercise in written + removed}
+        )
+    else:
+        for exercise in written:
+            add_set(db, owner_id, exercise)
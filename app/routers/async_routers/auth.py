@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security.oauth2 import OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ... import database, schemas, models, utils, oauth2
+
+router = APIRouter(tags=["Authentication"])
+
+
+@router.post("/login", response_model=schemas.Token)
+async def login(
+    user_credentials: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(database.get_async_db),
+):
+    user = await db.scalar(
+        select(models.User).where(models.User.username == user_credentials.username)
+    )
+
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail=f"Invalid Credentials"
+        )
+
+    # waiting on the password pool blocks, keep it off the event loop
+    valid, new_hash = await run_in_threadpool(
+        utils.verify_and_update, user_credentials.password, user.password
+    )
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail=f"Invalid Credentials"
+        )
+
+    # the bcrypt cost changed since this hash was made
+    if new_hash:
+        user.password = new_hash
+        await db.commit()
+
+    access_token = oauth2.create_access_token(data={"user_id": user.id})
+
+    return {"access_token": access_token, "token_type": "bearer"}
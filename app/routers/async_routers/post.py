@@ -0,0 +1,233 @@
+from typing import List, Literal
+from fastapi import Request, Response, status, HTTPException, Depends, APIRouter
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from ...database import get_async_db
+from ... import models, schemas, oauth2
+from ...search import fulltext_page
+from ...feed import feed_entry, feed_page_async
+from ...pagination import NEXT_CURSOR_HEADER, encode_cursor, keyset_page, split_page
+from ...conditional import has_validators, make_etag, not_modified
+from ...serialization import post_list_adapter, serialize
+
+router = APIRouter(prefix="/posts", tags=["Posts"])
+
+# lazy loading is not available on an AsyncSession, so owners are always
+# joined in, and writes return the caller as the owner like the sync routes
+post_with_votes = select(models.Post, models.Post.votes_count.label("votes")).options(
+    joinedload(models.Post.owner)
+)
+post_columns = models.Post.__table__.columns
+
+
+@router.get("/", response_model=List[schemas.PostOut])
+async def get_posts(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.UserOut = Depends(oauth2.get_current_user_async),
+    search: str | None = None,
+    search_mode: Literal["contains", "fulltext"] = "contains",
+    owner_id: int | None = None,
+    limit: int = 10,
+    offset: int = 0,
+    cursor: str | None = None,
+):
+    post_query = post_with_votes
+
+    if search and search_mode == "contains":
+        post_query = post_query.where(models.Post.title.contains(search))
+
+    if not owner_id:
+        post_query = post_query.where(
+            or_(models.Post.owner_id == current_user.id, models.Post.private == False)
+        )
+    else:
+        if owner_id != current_user.id:
+            post_query = post_query.where(models.Post.private == False)
+        post_query = post_query.where(models.Post.owner_id == owner_id)
+
+    ranked = bool(search) and search_mode == "fulltext"
+    # one row past the page tells whether another follows, relevance pages
+    # have no cursor
+    fetch = limit if ranked else limit + 1
+    # the plain newest first listing reads its page from the feed, like the
+    # sync route
+    feed_ids = None
+    if not (owner_id or search or offset):
+        feed_ids = await feed_page_async(db, current_user.id, cursor, fetch)
+
+    if feed_ids is not None:
+        post_query = post_query.where(models.Post.id.in_(feed_ids)).order_by(
+            models.Post.created_at.desc(), models.Post.id.desc()
+        )
+    elif ranked:
+        # ordered by relevance, so pages are plain limit/offset
+        post_query = fulltext_page(post_query, search, limit, offset)
+    else:
+        post_query = keyset_page(
+            post_query, [models.Post.created_at, models.Post.id], cursor, fetch
+        ).offset(offset)
+
+    versions = None
+    if has_validators(request):
+        versions = [
+            tuple(row)
+            for row in await db.execute(
+                post_query.with_only_columns(models.Post.id, models.Post.updated_at)
+            )
+        ]
+        versions = versions[:limit]
+        if versions and (
+            cached := not_modified(
+                request, response, make_etag(current_user.id, versions)
+            )
+        ):
+            return cached
+
+    posts, more = split_page((await db.execute(post_query)).all(), limit)
+
+    if not posts:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"no posts with the given criteria found",
+        )
+
+    if versions is None:
+        versions = [(post.Post.id, post.Post.updated_at) for post in posts]
+        not_modified(request, response, make_etag(current_user.id, versions))
+
+    if more:
+        last = posts[-1].Post
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+
+    return serialize(post_list_adapter, posts, response)
+
+
+@router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.Post)
+async def create_post(
+    post: schemas.PostBase,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.UserOut = Depends(oauth2.get_current_user_async),
+):
+    new_post = (
+        await db.execute(
+            insert(models.Post)
+            .values(owner_id=current_user.id, **post.model_dump())
+            .returning(*post_columns)
+        )
+    ).one()
+    if not new_post.private:
+        await db.execute(feed_entry(db, new_post))
+    await db.commit()
+
+    return {**new_post._asdict(), "owner": current_user}
+
+
+@router.get("/{id}", response_model=schemas.PostOut)
+async def get_post(
+    id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.UserOut = Depends(oauth2.get_current_user_async),
+):
+    version = None
+    if has_validators(request):
+        version = await db.scalar(
+            select(models.Post.updated_at).where(
+                models.Post.id == id,
+                or_(
+                    models.Post.owner_id == current_user.id,
+                    models.Post.private == False,
+                ),
+            )
+        )
+        if version and (
+            cached := not_modified(request, response, make_etag(id, version), version)
+        ):
+            return cached
+
+    post = (await db.execute(post_with_votes.where(models.Post.id == id))).first()
+
+    if not post:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"post with id: {id} was not found",
+        )
+
+    if post.Post.private == True and post.Post.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail=f"this post is private"
+        )
+
+    if version is None:
+        version = post.Post.updated_at
+        not_modified(request, response, make_etag(id, version), version)
+
+    return post
+
+
+@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_post(
+    id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.UserOut = Depends(oauth2.get_current_user_async),
+):
+    post = await db.get(models.Post, id)
+
+    if not post:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"A post with id: {id} does not exist.",
+        )
+
+    if post.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Not authorised to perform the requested action.",
+        )
+
+    await db.execute(
+        delete(models.Post)
+        .where(models.Post.id == id)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.put("/{id}", response_model=schemas.Post)
+async def update_post(
+    id: int,
+    updated_post: schemas.PostBase,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.UserOut = Depends(oauth2.get_current_user_async),
+):
+    post = (
+        await db.execute(
+            update(models.Post)
+            .where(models.Post.id == id, models.Post.owner_id == current_user.id)
+            .values(**updated_post.model_dump())
+            .returning(*post_columns)
+            .execution_options(synchronize_session=False)
+        )
+    ).first()
+
+    if not post:
+        if await db.scalar(select(models.Post.id).where(models.Post.id == id)):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Not authorised to perform the request action.",
+            )
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"A post with id: {id} does not exist.",
+        )
+
+    await db.execute(feed_entry(db, post))
+    await db.commit()
+
+    return {**post._asdict(), "owner": current_user}
@@ -0,0 +1,36 @@
+from fastapi import status, HTTPException, Depends, APIRouter
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ...database import get_async_db
+from ... import models, schemas, utils
+
+router = APIRouter(prefix="/users", tags=["Users"])
+
+
+@router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.UserOut)
+async def create_user(
+    user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)
+):
+    hashed_password = await run_in_threadpool(utils.hash, user.password)
+    user.password = hashed_password
+
+    new_user = models.User(**user.model_dump())
+    db.add(new_user)
+    await db.commit()
+    await db.refresh(new_user)
+
+    return new_user
+
+
+@router.get("/{id}", response_model=schemas.UserOut)
+async def get_user(id: int, db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(models.User).where(models.User.id == id))
+
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"user with id: {id} was not found",
+        )
+
+    return user
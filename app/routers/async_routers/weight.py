@@ -0,0 +1,191 @@
+from datetime import date as date_type, datetime
+from typing import List
+from fastapi import Request, Response, status, HTTPException, Depends, APIRouter, Query
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from ...database import get_async_db
+from ... import models, schemas, oauth2
+from ...pagination import NEXT_CURSOR_HEADER, encode_cursor, keyset_page, split_page
+from ...crud import CONFLICT_COLUMNS, insert_for
+from ...partitions import write_partitioned
+from ...summary import summary_writes
+from ...conditional import make_etag, not_modified
+from ...downsample import MAX_POINTS, lttb
+from ...serialization import data_list_adapter, serialize
+
+router = APIRouter(prefix="/data/weight", tags=["Data"])
+
+
+def owner_date_filter(current_user: schemas.UserOut, date: datetime):
+    # asyncpg does not coerce strings to dates, so compare as a date
+    return (
+        models.Weight.owner_id == current_user.id,
+        models.Weight.date == date.date(),
+    )
+
+
+@router.get("/", response_model=List[schemas.DataOut])
+async def get_weights(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.UserOut = Depends(oauth2.get_current_user_async),
+    limit: int = 10,
+    offset: int = 0,
+    cursor: str | None = None,
+    start: date_type | None = None,
+    end: date_type | None = None,
+    max_points: int | None = Query(None, ge=3, le=MAX_POINTS),
+):
+    page_key = [models.Weight.date, models.Weight.id]
+    data_query = select(models.Weight).where(models.Weight.owner_id == current_user.id)
+    if start:
+        data_query = data_query.where(models.Weight.date >= start)
+    if end:
+        data_query = data_query.where(models.Weight.date <= end)
+
+    if max_points is not None:
+        data_query = data_query.order_by(*page_key)
+    else:
+        data_query = keyset_page(data_query, page_key, cursor, limit + 1).offset(offset)
+    data, more = (await db.scalars(data_query)).all(), False
+    if max_points is None:
+        data, more = split_page(data, limit)
+
+    if not data:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No weight data with the given criteria found.",
+        )
+
+    if max_points is not None:
+        data = lttb(
+            data,
+            max_points,
+            x=lambda row: row.date.toordinal(),
+            y=lambda row: row.datapoint,
+        )[::-1]
+
+    # same version as the sync route, the page rows themselves
+    versions = [(row.datapoint, row.date, row.created_at, row.id) for row in data]
+    if cached := not_modified(request, response, make_etag(versions)):
+        return cached
+
+    if more:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(data[-1].date, data[-1].id)
+
+    return serialize(data_list_adapter, data, response)
+
+
+@router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.DataEntry)
+async def add_weight(
+    weight: schemas.DataEntry,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.UserOut = Depends(oauth2.get_current_user_async),
+):
+    stmt = (
+        insert_for(db, models.Weight)
+        .values(owner_id=current_user.id, **weight.model_dump())
+        .on_conflict_do_nothing(index_elements=CONFLICT_COLUMNS)
+        .returning(models.Weight.date, models.Weight.datapoint)
+    )
+    new_weight = await db.run_sync(
+        lambda session: write_partitioned(
+            session,
+            models.Weight.__table__,
+            [weight.date],
+            lambda: session.execute(stmt).first(),
+        )
+    )
+
+    if not new_weight:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Weight already record for date: {weight.date}",
+        )
+
+    for stmt in summary_writes(
+        db, models.Weight, current_user.id, [new_weight._mapping]
+    ):
+        await db.execute(stmt)
+    await db.commit()
+
+    return new_weight
+
+
+@router.get("/{date}", response_model=schemas.DataEntry)
+async def get_weight(
+    date: datetime,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.UserOut = Depends(oauth2.get_current_user_async),
+):
+    data = await db.scalar(
+        select(models.Weight).where(*owner_date_filter(current_user, date))
+    )
+
+    if not data:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No Weight data with date: {date.date()} was not found",
+        )
+
+    return data
+
+
+@router.delete("/{date}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_weight(
+    date: datetime,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.UserOut = Depends(oauth2.get_current_user_async),
+):
+    result = await db.execute(
+        delete(models.Weight)
+        .where(*owner_date_filter(current_user, date))
+        .execution_options(synchronize_session=False)
+    )
+
+    if not result.rowcount:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No weight record exists for date: {date.date()}.",
+        )
+
+    for stmt in summary_writes(
+        db, models.Weight, current_user.id, [], [{"date": date.date()}]
+    ):
+        await db.execute(stmt)
+    await db.commit()
+
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.put("/{date}", response_model=schemas.DataOut)
+async def update_weight(
+    date: datetime,
+    updated_weight: schemas.DataBase,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.UserOut = Depends(oauth2.get_current_user_async),
+):
+    data = (
+        await db.execute(
+            update(models.Weight)
+            .where(*owner_date_filter(current_user, date))
+            .values(updated_weight.model_dump())
+            .returning(
+                models.Weight.datapoint, models.Weight.date, models.Weight.created_at
+            )
+            .execution_options(synchronize_session=False)
+        )
+    ).first()
+
+    if not data:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No weight record exists for date: {date.date()}.",
+        )
+
+    for stmt in summary_writes(db, models.Weight, current_user.id, [data._mapping]):
+        await db.execute(stmt)
+    await db.commit()
+
+    return data
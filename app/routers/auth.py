@@ -23,11 +23,17 @@ def login(
             status_code=status.HTTP_403_FORBIDDEN, detail=f"Invalid Credentials"
         )
 
-    if not utils.verify(user_credentials.password, user.password):
+    valid, new_hash = utils.verify_and_update(user_credentials.password, user.password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail=f"Invalid Credentials"
         )
 
+    # the bcrypt cost changed since this hash was made
+    if new_hash:
+        user.password = new_hash
+        db.commit()
+
     access_token = oauth2.create_access_token(data={"user_id": user.id})
 
     return {"access_token": access_token, "token_type": "bearer"}
@@ -1,15 +1,22 @@
-from typing import List
+import importlib.util
+from typing import List, Literal
 from fastapi import Response, status, HTTPException, Depends, APIRouter
-from sqlalchemy import or_
+from fastapi.responses import StreamingResponse
+from sqlalchemy import or_, select, union_all
 from sqlalchemy.orm import Session
-from ..database import get_db
-from .. import models, schemas, oauth2
-from datetime import datetime
-from .data_routers import weight
+from ..database import get_read_db
+from .. import models, schemas, oauth2, export
+from ..crud import METRIC_MODELS, metric_rows
+from datetime import date, datetime
+from .data_routers import weight, calories, steps, exercise
 
 router = APIRouter(prefix="/data", tags=["Data"])
 
 router.include_router(weight.router)
+router.include_router(calories.router)
+router.include_router(steps.router)
+router.include_router(exercise.records_router)
+router.include_router(exercise.router)
 
 """
  - get_datapoints
@@ -22,9 +29,65 @@ router.include_router(weight.router)
 # , response_model=AllData | List[schemas.DataOut] | List[schemas.ExerciseOut]
 
 
-@router.get("/")
+@router.get("/", response_model=schemas.AllData)
 def get_data(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: schemas.UserOut = Depends(oauth2.get_current_user),
+    start: date | None = None,
+    end: date | None = None,
 ):
-    return {"message": "This will return all users datapoints."}
+    # one UNION ALL round trip for all four tables, read as plain rows
+    selects = [
+        metric_rows(metric, current_user.id, start, end).order_by(None)
+        for metric in METRIC_MODELS
+    ]
+    combined = union_all(*selects).subquery()
+    rows = db.execute(
+        select(combined).order_by(combined.c.date, combined.c.created_at)
+    ).all()
+
+    data = {f"{metric}_data": [] for metric in METRIC_MODELS}
+    for row in rows:
+        data[f"{row.metric}_data"].append(row._asdict())
+
+    return data
+
+
+@router.get("/summary", response_model=List[schemas.DailySummaryOut])
+def get_summary(
+    db: Session = Depends(get_read_db),
+    current_user: schemas.UserOut = Depends(oauth2.get_current_user),
+    start: date | None = None,
+    end: date | None = None,
+):
+    # a range read of the (owner_id, date) primary key
+    query = select(models.DailySummary).where(
+        models.DailySummary.owner_id == current_user.id
+    )
+    if start:
+        query = query.where(models.DailySummary.date >= start)
+    if end:
+        query = query.where(models.DailySummary.date <= end)
+
+    return db.scalars(query.order_by(models.DailySummary.date)).all()
+
+
+@router.get("/export")
+def export_data(
+    format: Literal["ndjson", "csv", "parquet"] = "ndjson",
+    db: Session = Depends(get_read_db),
+    current_user: schemas.UserOut = Depends(oauth2.get_current_user),
+):
+    if format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=f"Parquet export is not available on this server.",
+        )
+
+    chunks = export.ENCODERS[format](export.row_batches(db.get_bind(), current_user.id))
+
+    return StreamingResponse(
+        chunks,
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="export.{format}"'},
+    )
@@ -0,0 +1,79 @@
+from datetime import date
+from typing import List
+from fastapi import status, HTTPException, Depends, APIRouter
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from ...database import get_read_db
+from ... import models, schemas, oauth2
+from ...records import update_records
+from .metric import create_metric_router
+
+# several sets can be logged on the same day, so rows are addressed by id
+router = create_metric_router(
+    models.Exercise,
+    prefix="/exercise",
+    label="exercise",
+    columns={
+        "datapoint": models.Exercise.weight,
+        "name": models.Exercise.name,
+        "reps": models.Exercise.reps,
+        "date": models.Exercise.date,
+    },
+    entry_schema=schemas.ExerciseEntry,
+    update_schema=schemas.ExerciseEntry,
+    out_schema=schemas.ExerciseOut,
+    key="id",
+    on_write=update_records,
+)
+
+# included ahead of router, whose /{id} would otherwise match /records
+records_router = APIRouter(prefix="/exercise/records")
+
+
+@records_router.get("/", response_model=List[schemas.ExerciseRecordOut])
+def get_records(
+    db: Session = Depends(get_read_db),
+    current_user: schemas.UserOut = Depends(oauth2.get_current_user),
+):
+    return db.scalars(
+        select(models.ExerciseRecord)
+        .where(models.ExerciseRecord.owner_id == current_user.id)
+        .order_by(models.ExerciseRecord.name)
+    ).all()
+
+
+@records_router.get("/{name}", response_model=schemas.ExerciseRecordOut)
+def get_record(
+    name: str,
+    db: Session = Depends(get_read_db),
+    current_user: schemas.UserOut = Depends(oauth2.get_current_user),
+):
+    record = db.get(models.ExerciseRecord, (current_user.id, name))
+
+    if not record:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No exercise records exist for: {name}.",
+        )
+
+    return record
+
+
+@records_router.get("/{name}/volume", response_model=List[schemas.ExerciseVolumeOut])
+def get_volume(
+    name: str,
+    db: Session = Depends(get_read_db),
+    current_user: schemas.UserOut = Depends(oauth2.get_current_user),
+    start: date | None = None,
+    end: date | None = None,
+):
+    query = select(models.ExerciseVolume).where(
+        models.ExerciseVolume.owner_id == current_user.id,
+        models.ExerciseVolume.name == name,
+    )
+    if start:
+        query = query.where(models.ExerciseVolume.week >= start)
+    if end:
+        query = query.where(models.ExerciseVolume.week <= end)
+
+    return db.scalars(query.order_by(models.ExerciseVolume.week)).all()
@@ -0,0 +1,438 @@
+from datetime import date as date_type
+from typing import Callable, List, Literal
+from fastapi import (
+    Request,
+    Response,
+    status,
+    HTTPException,
+    Depends,
+    APIRouter,
+    Path,
+    Query,
+)
+from sqlalchemy import and_, bindparam, delete, insert, select, tuple_, update
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+from ...database import get_db, get_read_db
+from ... import schemas, oauth2
+from ...pagination import (
+    NEXT_CURSOR_HEADER,
+    decode_cursor,
+    encode_cursor,
+    split_page,
+)
+from ...stats import metric_stats
+from ...crud import CONFLICT_COLUMNS, insert_for, upsert_data
+from ...conditional import make_etag, not_modified
+from ...downsample import MAX_POINTS, lttb
+from ...partitions import write_partitioned
+from ...summary import summary_writes
+from ...serialization import serialize
+
+
+def create_metric_router(
+    model,
+    *,
+    prefix: str,
+    label: str,
+    columns: dict | None = None,
+    entry_schema=schemas.DataEntry,
+    update_schema=schemas.DataBase,
+    out_schema=schemas.DataOut,
+    key: Literal["date", "id"] = "date",
+    on_write: Callable[[Session, int, list, list], None] | None = None,
+) -> APIRouter:
+    """Builds the CRUD routes for one metric table.
+
+    columns maps schema fields to model columns, by default datapoint and
+    date. Tables keyed by date hold one row per user per day and also get
+    the bulk and stats routes, tables keyed by id (exercise) can have
+    several rows on the same day.
+
+    on_write(db, owner_id, written, removed) runs in each write's
+    transaction with the rows added and the rows deleted or replaced, as
+    mappings of the schema fields. It is only supported on tables keyed by
+    id, bulk overwrites of date keyed tables don't report what they replace.
+
+    All statements are built once here with bound parameters, and every
+    route is a single statement (plus the daily summary upsert for
+    writes): writes use RETURNING instead of a lookup before and a refresh
+    after, and reads select plain columns rather than ORM objects.
+    """
+    router = APIRouter(prefix=prefix)
+
+    columns = columns or {"datapoint": model.datapoint, "date": model.date}
+    key_column = getattr(model, key)
+    key_type = date_type if key == "date" else int
+    page_key = [model.date, model.id]
+
+    out_columns = [
+        *(column.label(field) for field, column in columns.items()),
+        model.created_at,
+        model.id,
+    ]
+    owner_filter = model.owner_id == bindparam("user_id")
+    owner_key_filter = and_(
+        owner_filter, key_column == bindparam("key", type_=key_column.type)
+    )
+
+    list_stmt = (
+        select(*out_columns)
+        .where(owner_filter)
+        .order_by(*(column.desc() for column in page_key))
+        .limit(bindparam("limit"))
+        .offset(bindparam("offset"))
+    )
+    list_after_cursor_stmt = list_stmt.where(
+        tuple_(*page_key)
+        < tuple_(*(bindparam(f"cursor_{column.key}") for column in page_key))
+    )
+    # a whole date range, oldest first, to be downsampled
+    series_stmt = select(*out_columns).where(owner_filter).order_by(*page_key)
+    get_stmt = select(*out_columns).where(owner_key_filter)
+    update_stmt = (
+        update(model)
+        .values(
+            {
+                columns[field].key: bindparam(f"new_{field}")
+                for field in update_schema.model_fields
+            }
+        )
+        .returning(*out_columns)
+        .execution_options(synchronize_session=False)
+    )
+    if key == "id":
+        # any column of a row addressed by id can change, including the day
+        # it's summarised under, so updates also return the previous values
+        previous = (
+            select(
+                model.id,
+                *(
+                    column.label(f"previous_{field}")
+                    for field, column in columns.items()
+                ),
+            )
+            .where(owner_key_filter)
+            .subquery("previous")
+        )
+        update_stmt = update_stmt.where(model.id == previous.c.id).returning(
+            *(column for column in previous.c if column.key != "id")
+        )
+    else:
+        if on_write:
+            raise ValueError("on_write needs a table keyed by id")
+        update_stmt = update_stmt.where(owner_key_filter)
+    delete_stmt = delete(model).where(owner_key_filter).returning(*out_columns)
+
+    list_adapter = TypeAdapter(List[out_schema])
+
+    # the ON CONFLICT clause is dialect specific, so these are built once per
+    # dialect on first use
+    add_stmts = {}
+
+    def add_stmt(db: Session):
+        dialect = db.get_bind().dialect.name
+        if dialect not in add_stmts:
+            values = {
+                column.key: bindparam(f"new_{field}")
+                for field, column in columns.items()
+            }
+            if key == "date":
+                stmt = (
+                    insert_for(db, model)
+                    .values(owner_id=bindparam("user_id"), **values)
+                    .on_conflict_do_nothing(index_elements=CONFLICT_COLUMNS)
+                )
+            else:
+                stmt = insert(model).values(owner_id=bindparam("user_id"), **values)
+            add_stmts[dialect] = stmt.returning(*out_columns)
+
+        return add_stmts[dialect]
+
+    def new_values(entry) -> dict:
+        return {f"new_{field}": value for field, value in entry.model_dump().items()}
+
+    def write_dates(db: Session, dates, write):
+        return write_partitioned(db, model.__table__, dates, write)
+
+    def after_write(db: Session, owner_id: int, written: list, removed: list):
+        for stmt in summary_writes(db, model, owner_id, written, removed):
+            db.execute(stmt)
+        if on_write:
+            on_write(db, owner_id, written, removed)
+
+    def not_found(value):
+        return HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No {label} record exists for {key}: {value}.",
+        )
+
+    @router.get("/", response_model=List[out_schema], name=f"get_{label}_list")
+    def get_data(
+        request: Request,
+        response: Response,
+        db: Session = Depends(get_read_db),
+        current_user: schemas.UserOut = Depends(oauth2.get_current_user),
+        limit: int = 10,
+        offset: int = 0,
+        cursor: str | None = None,
+        start: date_type | None = None,
+        end: date_type | None = None,
+        max_points: int | None = Query(None, ge=3, le=MAX_POINTS),
+    ):
+        # newest first a page at a time, or with max_points the whole start
+        # to end range downsampled to at most that many points for charts
+        params = {"user_id": current_user.id, "limit": limit + 1, "offset": offset}
+        stmt = list_stmt
+        if max_points is not None:
+            stmt = series_stmt
+        elif cursor:
+            cursor_values = decode_cursor(cursor, page_key)
+            params.update(
+                {
+                    f"cursor_{column.key}": value
+                    for column, value in zip(page_key, cursor_values)
+                }
+            )
+            stmt = list_after_cursor_stmt
+
+        # a range scan of the (owner_id, date) index
+        if start:
+            stmt = stmt.where(model.date >= bindparam("start"))
+            params["start"] = start
+        if end:
+            stmt = stmt.where(model.date <= bindparam("end"))
+            params["end"] = end
+
+        data, more = db.execute(stmt, params).all(), False
+        if max_points is None:
+            data, more = split_page(data, limit)
+
+        if not data:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No {label} data with the given criteria found.",
+            )
+
+        if max_points is not None:
+            data = lttb(
+                data,
+                max_points,
+                x=lambda row: row.date.toordinal(),
+                y=lambda row: row.datapoint,
+            )[::-1]
+
+        # the rows are as small as a version lookup would be, so the page
+        # itself is the version and a 304 only skips serialization
+        if cached := not_modified(
+            request, response, make_etag([tuple(row) for row in data])
+        ):
+            return cached
+
+        if more:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+                data[-1].date, data[-1].id
+            )
+
+        return serialize(list_adapter, data, response)
+
+    if key == "date":
+
+        @router.get(
+            "/stats", response_model=schemas.DataStats, name=f"get_{label}_stats"
+        )
+        def get_stats(
+            db: Session = Depends(get_read_db),
+            current_user: schemas.UserOut = Depends(oauth2.get_current_user),
+            period: Literal["day", "week", "month"] = "day",
+            start: date_type | None = None,
+            end: date_type | None = None,
+        ):
+            return metric_stats(db, model, current_user.id, period, start, end)
+
+    # rows addressed by id are only reachable again through the id, so it
+    # comes back with the new row
+    @router.post(
+        "/",
+        status_code=status.HTTP_201_CREATED,
+        response_model=out_schema if key == "id" else entry_schema,
+        name=f"add_{label}",
+    )
+    def add_data(
+        entry: entry_schema,
+        db: Session = Depends(get_db),
+        current_user: schemas.UserOut = Depends(oauth2.get_current_user),
+    ):
+        # for date keyed tables the unique (owner_id, date) constraint does
+        # the duplicate check
+        new_data = write_dates(
+            db,
+            [entry.date],
+            lambda: db.execute(
+                add_stmt(db), {"user_id": current_user.id, **new_values(entry)}
+            ).first(),
+        )
+
+        if not new_data:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{label.capitalize()} already recorded for date: {entry.date}",
+            )
+
+        after_write(db, current_user.id, [new_data._mapping], [])
+        db.commit()
+
+        return new_data
+
+    if key == "date":
+
+        @router.post(
+            "/bulk",
+            status_code=status.HTTP_201_CREATED,
+            response_model=schemas.DataBulkOut,
+            name=f"add_{label}_bulk",
+        )
+        def add_data_bulk(
+            bulk: schemas.DataBulkEntry,
+            db: Session = Depends(get_db),
+            current_user: schemas.UserOut = Depends(oauth2.get_current_user),
+        ):
+            entries = {}
+            for entry in bulk.data:
+                if entry.date in entries:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Duplicate {label} entry in request for date: {entry.date}",
+                    )
+                entries[entry.date] = entry.datapoint
+
+            if not entries:
+                return {"inserted": 0, "updated": 0, "skipped": 0, "conflicts": []}
+
+            overwrite = bulk.on_conflict == "overwrite"
+            existing = set()
+            if overwrite:
+                # every row is written, so the conflicts have to be looked up
+                existing = set(
+                    db.scalars(
+                        select(model.date).where(
+                            model.owner_id == current_user.id,
+                            model.date.in_(entries.keys()),
+                        )
+                    )
+                )
+
+            written = write_dates(
+                db,
+                entries.keys(),
+                lambda: upsert_data(
+                    db,
+                    model,
+                    [
+                        {
+                            "owner_id": current_user.id,
+                            "date": date,
+                            "datapoint": datapoint,
+                        }
+                        for date, datapoint in entries.items()
+                    ],
+                    overwrite=overwrite,
+                ),
+            )
+
+            if not overwrite:
+                existing = entries.keys() - set(written)
+            conflicts = sorted(existing)
+
+            if conflicts and bulk.on_conflict == "fail":
+                db.rollback()
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail={
+                        "message": f"{label.capitalize()} already recorded for one or more dates.",
+                        "conflicts": [str(conflict) for conflict in conflicts],
+                    },
+                )
+
+            for stmt in summary_writes(
+                db,
+                model,
+                current_user.id,
+                [{"date": date, "datapoint": entries[date]} for date in written],
+            ):
+                db.execute(stmt)
+            db.commit()
+
+            return {
+                "inserted": len(entries) - len(conflicts),
+                "updated": len(conflicts) if overwrite else 0,
+                "skipped": 0 if overwrite else len(conflicts),
+                "conflicts": conflicts,
+            }
+
+    @router.get(f"/{{{key}}}", response_model=out_schema, name=f"get_{label}")
+    def get_one(
+        value: key_type = Path(alias=key),
+        db: Session = Depends(get_read_db),
+        current_user: schemas.UserOut = Depends(oauth2.get_current_user),
+    ):
+        data = db.execute(get_stmt, {"user_id": current_user.id, "key": value}).first()
+
+        if not data:
+            raise not_found(value)
+
+        return data
+
+    @router.delete(
+        f"/{{{key}}}",
+        status_code=status.HTTP_204_NO_CONTENT,
+        name=f"delete_{label}",
+    )
+    def delete_one(
+        value: key_type = Path(alias=key),
+        db: Session = Depends(get_db),
+        current_user: schemas.UserOut = Depends(oauth2.get_current_user),
+    ):
+        deleted = db.execute(
+            delete_stmt, {"user_id": current_user.id, "key": value}
+        ).first()
+
+        if not deleted:
+            raise not_found(value)
+
+        after_write(db, current_user.id, [], [deleted._mapping])
+        db.commit()
+
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+    @router.put(f"/{{{key}}}", response_model=out_schema, name=f"update_{label}")
+    def update_one(
+        updated_data: update_schema,
+        value: key_type = Path(alias=key),
+        db: Session = Depends(get_db),
+        current_user: schemas.UserOut = Depends(oauth2.get_current_user),
+    ):
+        # date keyed rows keep their date, only id keyed ones can move
+        data = write_dates(
+            db,
+            [updated_data.date] if "date" in update_schema.model_fields else [],
+            lambda: db.execute(
+                update_stmt,
+                {"user_id": current_user.id, "key": value, **new_values(updated_data)},
+            ).first(),
+        )
+
+        if not data:
+            raise not_found(value)
+
+        removed = []
+        if key == "id":
+            removed.append(
+                {field: data._mapping[f"previous_{field}"] for field in columns}
+            )
+        after_write(db, current_user.id, [data._mapping], removed)
+        db.commit()
+
+        return data
+
+    return router
@@ -0,0 +1,4 @@
+from ... import models
+from .metric import create_metric_router
+
+router = create_metric_router(models.Step, prefix="/steps", label="steps")
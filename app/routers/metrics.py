@@ -0,0 +1,30 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from .. import database
+from ..instrumentation import request_metrics
+from ..pool import pool_status
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(
+        request_metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE
+    )
+
+
+@router.get("/pool")
+def get_pool_metrics():
+    pools = {"primary": pool_status(database.get_engine().pool)}
+    # in the order of settings.database_replica_urls
+    for i, replica in enumerate(database.get_replica_engines()):
+        pools[f"replica_{i}"] = pool_status(replica.pool)
+
+    async_engine = database.get_async_engine()
+    if async_engine is not None:
+        pools["async"] = pool_status(async_engine.pool)
+
+    return pools
@@ -1,29 +1,39 @@
-from typing import List
-from fastapi import Response, status, HTTPException, Depends, APIRouter
-from sqlalchemy import func, or_
-from sqlalchemy.orm import Session
-from ..database import get_db
+from typing import List, Literal
+from fastapi import Request, Response, status, HTTPException, Depends, APIRouter
+from sqlalchemy import insert, or_, update
+from sqlalchemy.orm import Session, joinedload
+from ..database import get_db, get_read_db
 from .. import models, schemas, oauth2
+from ..search import fulltext_page
+from ..feed import feed_entry, feed_page
+from ..pagination import NEXT_CURSOR_HEADER, encode_cursor, keyset_page, split_page
+from ..conditional import has_validators, make_etag, not_modified
+from ..serialization import post_list_adapter, serialize
 
 router = APIRouter(prefix="/posts", tags=["Posts"])
 
+# schemas.Post nests the owner. Reads join it in, and writes return the
+# caller as the owner, since only the owner can create or update a post.
+with_owner = joinedload(models.Post.owner)
+post_columns = models.Post.__table__.columns
+
 
 @router.get("/", response_model=List[schemas.PostOut])
 def get_posts(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     current_user: schemas.UserOut = Depends(oauth2.get_current_user),
     search: str | None = None,
+    search_mode: Literal["contains", "fulltext"] = "contains",
     owner_id: int | None = None,
     limit: int = 10,
     offset: int = 0,
+    cursor: str | None = None,
 ):
-    post_query = (
-        db.query(models.Post, func.count(models.Vote.post_id).label("votes"))
-        .join(models.Vote, models.Vote.post_id == models.Post.id, isouter=True)
-        .group_by(models.Post.id)
-    )
+    post_query = db.query(models.Post, models.Post.votes_count.label("votes"))
 
-    if search:
+    if search and search_mode == "contains":
         post_query = post_query.filter(models.Post.title.contains(search))
 
     if not owner_id:
@@ -35,8 +45,45 @@ def get_posts(
             post_query = post_query.filter(models.Post.private == False)
         post_query = post_query.filter(models.Post.owner_id == owner_id)
 
-    post_query = post_query.limit(limit).offset(offset)
-    posts = post_query.all()
+    ranked = bool(search) and search_mode == "fulltext"
+    # one row past the page tells whether another follows, relevance pages
+    # have no cursor
+    fetch = limit if ranked else limit + 1
+    # the plain newest first listing reads its page from the feed, and
+    # then loads just those posts by primary key
+    feed_ids = None
+    if not (owner_id or search or offset):
+        feed_ids = feed_page(db, current_user.id, cursor, fetch)
+
+    if feed_ids is not None:
+        post_query = post_query.filter(models.Post.id.in_(feed_ids)).order_by(
+            models.Post.created_at.desc(), models.Post.id.desc()
+        )
+    elif ranked:
+        # ordered by relevance, so pages are plain limit/offset
+        post_query = fulltext_page(post_query, search, limit, offset)
+    else:
+        post_query = keyset_page(
+            post_query, [models.Post.created_at, models.Post.id], cursor, fetch
+        ).offset(offset)
+
+    # a page is current while its rows and their versions are unchanged, a
+    # poll with a validator checks that from the keys before loading posts
+    versions = None
+    if has_validators(request):
+        versions = [
+            tuple(row)
+            for row in post_query.with_entities(models.Post.id, models.Post.updated_at)
+        ]
+        versions = versions[:limit]
+        if versions and (
+            cached := not_modified(
+                request, response, make_etag(current_user.id, versions)
+            )
+        ):
+            return cached
+
+    posts, more = split_page(post_query.options(with_owner).all(), limit)
 
     if not posts:
         raise HTTPException(
@@ -44,7 +91,15 @@ def get_posts(
             detail=f"no posts with the given criteria found",
         )
 
-    return posts
+    if versions is None:
+        versions = [(post.Post.id, post.Post.updated_at) for post in posts]
+        not_modified(request, response, make_etag(current_user.id, versions))
+
+    if more:
+        last = posts[-1].Post
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+
+    return serialize(post_list_adapter, posts, response)
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.Post)
@@ -53,24 +108,47 @@ def create_post(
     db: Session = Depends(get_db),
     current_user: schemas.UserOut = Depends(oauth2.get_current_user),
 ):
-    new_post = models.Post(owner_id=current_user.id, **post.model_dump())
-    db.add(new_post)
+    new_post = db.execute(
+        insert(models.Post)
+        .values(owner_id=current_user.id, **post.model_dump())
+        .returning(*post_columns)
+    ).one()
+    if not new_post.private:
+        db.execute(feed_entry(db, new_post))
     db.commit()
-    db.refresh(new_post)
 
-    return new_post
+    return {**new_post._asdict(), "owner": current_user}
 
 
 @router.get("/{id}", response_model=schemas.PostOut)
 def get_post(
     id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     current_user: schemas.UserOut = Depends(oauth2.get_current_user),
 ):
+    version = None
+    if has_validators(request):
+        version = (
+            db.query(models.Post.updated_at)
+            .filter(
+                models.Post.id == id,
+                or_(
+                    models.Post.owner_id == current_user.id,
+                    models.Post.private == False,
+                ),
+            )
+            .scalar()
+        )
+        if version and (
+            cached := not_modified(request, response, make_etag(id, version), version)
+        ):
+            return cached
+
     post = (
-        db.query(models.Post, func.count(models.Vote.post_id).label("votes"))
-        .join(models.Vote, models.Vote.post_id == models.Post.id, isouter=True)
-        .group_by(models.Post.id)
+        db.query(models.Post, models.Post.votes_count.label("votes"))
+        .options(with_owner)
         .filter(models.Post.id == id)
         .first()
     )
@@ -86,6 +164,10 @@ def get_post(
             status_code=status.HTTP_401_UNAUTHORIZED, detail=f"this post is private"
         )
 
+    if version is None:
+        version = post.Post.updated_at
+        not_modified(request, response, make_etag(id, version), version)
+
     return post
 
 
@@ -123,22 +205,27 @@ def update_post(
     db: Session = Depends(get_db),
     current_user: schemas.UserOut = Depends(oauth2.get_current_user),
 ):
-    post_query = db.query(models.Post).filter(models.Post.id == id)
-    post = post_query.first()
+    post = db.execute(
+        update(models.Post)
+        .where(models.Post.id == id, models.Post.owner_id == current_user.id)
+        .values(**updated_post.model_dump())
+        .returning(*post_columns)
+        .execution_options(synchronize_session=False)
+    ).first()
 
     if not post:
+        # only failed updates pay for finding out why
+        if db.query(models.Post.id).filter(models.Post.id == id).first():
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Not authorised to perform the request action.",
+            )
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"A post with id: {id} does not exist.",
         )
 
-    if post.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail=f"Not authorised to perform the request action.",
-        )
-
-    post_query.update(updated_post.model_dump(), synchronize_session=False)
+    db.execute(feed_entry(db, post))
     db.commit()
 
-    return post_query.first()
+    return {**post._asdict(), "owner": current_user}
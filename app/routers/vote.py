@@ -0,0 +1,72 @@
+from fastapi import status, HTTPException, Depends, APIRouter
+from sqlalchemy import and_, delete, update
+from sqlalchemy.orm import Session
+from ..database import get_db
+from .. import models, schemas, oauth2
+from ..crud import insert_for
+
+router = APIRouter(prefix="/vote", tags=["Vote"])
+
+
+@router.post("/", status_code=status.HTTP_201_CREATED)
+def vote(
+    vote: schemas.Vote,
+    db: Session = Depends(get_db),
+    current_user: schemas.UserOut = Depends(oauth2.get_current_user),
+):
+    post = db.query(models.Post).filter(models.Post.id == vote.post_id).first()
+
+    if not post:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"post with id: {vote.post_id} was not found",
+        )
+
+    if post.private == True and post.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail=f"this post is private"
+        )
+
+    if vote.dir == 1:
+        changed = db.execute(
+            insert_for(db, models.Vote)
+            .values(post_id=vote.post_id, user_id=current_user.id)
+            .on_conflict_do_nothing(index_elements=["post_id", "user_id"])
+            .returning(models.Vote.post_id)
+        ).first()
+
+        if not changed:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"user {current_user.id} has already voted on post {vote.post_id}",
+            )
+    else:
+        changed = db.execute(
+            delete(models.Vote)
+            .where(
+                and_(
+                    models.Vote.post_id == vote.post_id,
+                    models.Vote.user_id == current_user.id,
+                )
+            )
+            .returning(models.Vote.post_id)
+        ).first()
+
+        if not changed:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail=f"Vote does not exist"
+            )
+
+    # same transaction as the vote row, so the counter can't drift
+    db.execute(
+        update(models.Post)
+        .where(models.Post.id == vote.post_id)
+        .values(votes_count=models.Post.votes_count + (1 if vote.dir == 1 else -1))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+    if vote.dir == 1:
+        return {"message": "successfully added vote"}
+
+    return {"message": "successfully deleted vote"}
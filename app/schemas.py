@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, ConfigDict
-from typing import List
+from pydantic import BaseModel, EmailStr, ConfigDict, Field
+from typing import List, Literal
 from datetime import datetime, date
 
 
@@ -69,6 +69,39 @@ class DataOut(DataEntry):
     # owner: UserOut
 
 
+# Bulk ingest - on_conflict decides what happens to dates that already exist
+class DataBulkEntry(BaseModel):
+    data: List[DataEntry] = Field(max_length=10000)
+    on_conflict: Literal["skip", "overwrite", "fail"] = "fail"
+
+
+class DataBulkOut(BaseModel):
+    inserted: int
+    updated: int
+    skipped: int
+    conflicts: List[date]
+
+
+# Stats schemas - buckets per day/week/month plus daily moving averages
+class DataBucket(BaseModel):
+    start: date
+    min: float
+    max: float
+    mean: float
+    count: int
+
+
+class DataMovingAverage(DataEntry):
+    ma_7: float
+    ma_30: float
+
+
+class DataStats(BaseModel):
+    period: Literal["day", "week", "month"]
+    buckets: List[DataBucket]
+    moving_averages: List[DataMovingAverage]
+
+
 # Exercise schemas - reqs a exercise name and reps
 class ExerciseEntry(DataEntry):
     name: str
@@ -76,7 +109,7 @@ class ExerciseEntry(DataEntry):
 
 
 class ExerciseOut(ExerciseEntry):
-    # id: int
+    id: int
     created_at: datetime
     # owner_id: int
     # owner: UserOut
@@ -90,6 +123,35 @@ class ExerciseBasic(ExerciseEntry):
     datapoint: int | float
 
 
+# Personal records - best estimated 1RM, set and week per exercise name
+class ExerciseRecordOut(BaseModel):
+    name: str
+    e1rm: float
+    e1rm_brzycki: float | None
+    best_weight: float
+    best_reps: int
+    best_date: date
+    max_weight: float
+    best_week: date
+    best_week_volume: float
+
+
+class ExerciseVolumeOut(BaseModel):
+    week: date
+    volume: float
+    sets: int
+
+
+# Daily summary - one row per day with every metric recorded on it
+class DailySummaryOut(BaseModel):
+    date: date
+    weight: int | None
+    calories: float | None
+    steps: float | None
+    exercise_sets: int
+    exercise_volume: float
+
+
 class AllData(BaseModel):
     weight_data: List[DataEntry] = []
     calories_data: List[DataEntry] = []
@@ -99,4 +161,5 @@ class AllData(BaseModel):
 
 class Vote(BaseModel):
     post_id: int
-    dir: int
+    # 1 adds the vote, 0 removes it
+    dir: Literal[0, 1]
@@ -0,0 +1,20 @@
+from sqlalchemy import func, text
+from .models import Post, post_search_vector
+
+
+def fulltext_page(query, search: str, limit: int, offset: int):
+    """Filters query to posts matching search, most relevant first.
+
+    search takes web search syntax ("quoted phrases", or, -excluded) and is
+    matched against title and content through the posts GIN index. Works on
+    both legacy Query objects and select() statements.
+    """
+    ts_query = func.websearch_to_tsquery(text("'english'::regconfig"), search)
+    rank = func.ts_rank(post_search_vector, ts_query)
+
+    return (
+        query.where(post_search_vector.bool_op("@@")(ts_query))
+        .order_by(rank.desc(), Post.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
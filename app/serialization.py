@@ -0,0 +1,38 @@
+import importlib.util
+from typing import List
+from fastapi import Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+from . import schemas
+
+# optional dependency, responses that still go through response_model are
+# rendered with orjson when it is installed
+DefaultResponse = (
+    ORJSONResponse if importlib.util.find_spec("orjson") is not None else JSONResponse
+)
+
+# built once at import, building an adapter compiles its validator and
+# serializer
+post_list_adapter = TypeAdapter(List[schemas.PostOut])
+data_list_adapter = TypeAdapter(List[schemas.DataOut])
+
+
+def serialize(adapter: TypeAdapter, data, response: Response) -> Response:
+    """Renders a list route's rows straight to JSON bytes.
+
+    Returning a Response skips FastAPI's response_model handling, which
+    validates the rows into models, dumps those back to dicts and then
+    encodes the dicts. Here the rows are validated once and pydantic-core
+    writes the JSON itself. Headers set on the route's response are kept,
+    repeated ones like Set-Cookie included.
+    """
+    rendered = Response(
+        adapter.dump_json(adapter.validate_python(data, from_attributes=True)),
+        media_type="application/json",
+    )
+    rendered.raw_headers.extend(
+        (name, value)
+        for name, value in response.raw_headers
+        if name not in (b"content-length", b"content-type")
+    )
+    return rendered
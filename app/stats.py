@@ -0,0 +1,77 @@
+from datetime import date, timedelta
+from sqlalchemy import Date, cast, func, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.sqltypes import TIMESTAMP
+
+MOVING_AVERAGE_DAYS = [7, 30]
+
+EPOCH = date(1970, 1, 1)
+
+
+def metric_stats(
+    db: Session,
+    model,
+    owner_id: int,
+    period: str,
+    start: date | None = None,
+    end: date | None = None,
+) -> dict:
+    """Aggregates a metric table into period buckets and moving averages.
+
+    Both are computed by Postgres, buckets with date_trunc and the moving
+    averages with window functions, so only the results are sent back.
+    """
+    filters = [model.owner_id == owner_id]
+    if start:
+        filters.append(model.date >= start)
+    if end:
+        filters.append(model.date <= end)
+
+    # cast first, date_trunc on a bare date would pick the timestamptz
+    # overload and bucket in the session time zone
+    bucket = cast(func.date_trunc(period, cast(model.date, TIMESTAMP)), Date)
+    buckets = db.execute(
+        select(
+            bucket.label("start"),
+            func.min(model.datapoint).label("min"),
+            func.max(model.datapoint).label("max"),
+            func.avg(model.datapoint).label("mean"),
+            func.count().label("count"),
+        )
+        .where(*filters)
+        .group_by(bucket)
+        .order_by(bucket)
+    ).all()
+
+    # window frames are in days, days missing from the history simply don't
+    # count. Rows before start are read so the first averages are complete.
+    day_number = model.date - EPOCH
+    averages = {
+        f"ma_{days}": func.avg(model.datapoint).over(
+            order_by=day_number, range_=(-(days - 1), 0)
+        )
+        for days in MOVING_AVERAGE_DAYS
+    }
+    window_filters = [model.owner_id == owner_id]
+    if start:
+        window_filters.append(
+            model.date >= start - timedelta(days=max(MOVING_AVERAGE_DAYS) - 1)
+        )
+    if end:
+        window_filters.append(model.date <= end)
+
+    days = (
+        select(
+            model.date,
+            model.datapoint,
+            *(average.label(name) for name, average in averages.items()),
+        )
+        .where(*window_filters)
+        .subquery()
+    )
+    moving_averages_query = select(days).order_by(days.c.date)
+    if start:
+        moving_averages_query = moving_averages_query.where(days.c.date >= start)
+    moving_averages = db.execute(moving_averages_query).all()
+
+    return {"period": period, "buckets": buckets, "moving_averages": moving_averages}
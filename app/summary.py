@@ -0,0 +1,136 @@
+from sqlalchemy import delete, func, insert, select, union
+from sqlalchemy.orm import Session
+from . import models
+from .crud import METRIC_MODELS, insert_for
+
+SUMMARY_KEY = ["owner_id", "date"]
+
+# summary column holding each date keyed metric's datapoint
+SUMMARY_COLUMNS = {
+    models.Weight: "weight",
+    models.Calorie: "calories",
+    models.Step: "steps",
+}
+# exercise columns, adjusted by each write rather than replaced
+DELTA_COLUMNS = ["exercise_sets", "exercise_volume"]
+
+
+def day_values(model, owner_id, day) -> dict:
+    """The summary columns model fills in for one day, for rebuilds.
+
+    Each is a scalar subquery on the metric table's (owner_id, date) index.
+    owner_id and day can be plain values or columns of an outer query.
+    """
+    on_day = [model.owner_id == owner_id, model.date == day]
+
+    if model is models.Exercise:
+        return {
+            "exercise_sets": select(func.count()).where(*on_day).scalar_subquery(),
+            "exercise_volume": select(
+                func.coalesce(func.sum(model.weight * model.reps), 0)
+            )
+            .where(*on_day)
+            .scalar_subquery(),
+        }
+
+    return {
+        SUMMARY_COLUMNS[model]: select(model.datapoint).where(*on_day).scalar_subquery()
+    }
+
+
+def day_changes(model, written, removed) -> dict:
+    """What a write changes in each day's summary, as {date: columns}.
+
+    Date keyed metrics set their column to the written datapoint, or clear
+    it when removed. Exercise sets are counted in, or out, as deltas.
+    """
+    if model is not models.Exercise:
+        column = SUMMARY_COLUMNS[model]
+        changes = {row["date"]: {column: None} for row in removed}
+        changes.update({row["date"]: {column: row["datapoint"]} for row in written})
+        return changes
+
+    changes = {}
+    for rows, sign in ((written, 1), (removed, -1)):
+        for row in rows:
+            day = changes.setdefault(
+                row["date"], {"exercise_sets": 0, "exercise_volume": 0}
+            )
+            day["exercise_sets"] += sign
+            day["exercise_volume"] += sign * row["datapoint"] * row["reps"]
+    return {
+        day: values
+        for day, values in changes.items()
+        if values["exercise_sets"] or values["exercise_volume"]
+    }
+
+
+def summary_writes(db: Session, model, owner_id: int, written, removed=()) -> list:
+    """Statements applying a metric write to the summary.
+
+    Run them in the transaction that wrote the metric rows. written and
+    removed are the rows added and the rows deleted or replaced, as
+    mappings with date, datapoint and, for exercise, reps. Nothing is read
+    back from the metric tables: values come from the write itself and
+    exercise counts are added to the row as it is when the upsert takes
+    its lock, so concurrent writes to the same day can't overwrite each
+    other. Days left without any metric are deleted.
+    """
+    changes = day_changes(model, written, removed)
+    if not changes:
+        return []
+
+    rows = [
+        {"owner_id": owner_id, "date": day, **values}
+        for day, values in sorted(changes.items())
+    ]
+    stmt = insert_for(db, models.DailySummary).values(rows)
+    current = models.DailySummary.__table__.c
+    statements = [
+        stmt.on_conflict_do_update(
+            index_elements=SUMMARY_KEY,
+            set_={
+                column: (
+                    current[column] + stmt.excluded[column]
+                    if column in DELTA_COLUMNS
+                    else stmt.excluded[column]
+                )
+                for column in rows[0]
+                if column not in SUMMARY_KEY
+            },
+        )
+    ]
+
+    if removed:
+        summary = models.DailySummary
+        statements.append(
+            delete(summary).where(
+                summary.owner_id == owner_id,
+                summary.date.in_({row["date"] for row in removed}),
+                *(
+                    getattr(summary, column).is_(None)
+                    for column in SUMMARY_COLUMNS.values()
+                ),
+                summary.exercise_sets == 0,
+            )
+        )
+
+    return statements
+
+
+def rebuild_daily_summary(conn):
+    """Recomputes the whole summary, for data written around the routes."""
+    days = union(
+        *(select(model.owner_id, model.date) for model in METRIC_MODELS.values())
+    ).subquery()
+    values = {}
+    for model in METRIC_MODELS.values():
+        values.update(day_values(model, days.c.owner_id, days.c.date))
+
+    conn.execute(delete(models.DailySummary))
+    conn.execute(
+        insert(models.DailySummary).from_select(
+            [*SUMMARY_KEY, *values],
+            select(days.c.owner_id, days.c.date, *values.values()),
+        )
+    )
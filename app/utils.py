@@ -1,11 +1,91 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
+from .config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# hashes made with a different cost are flagged for rehashing on login
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds
+)
 
+# bcrypt runs in worker processes so it can't starve the request threads.
+# The pool is created on first use, and callers beyond the queue size are
+# turned away instead of queueing behind the backlog. Workers come from a
+# forkserver, forking the threaded server itself would copy held locks and
+# pooled DB connections into them.
+password_executor: ProcessPoolExecutor | None = None
+password_executor_lock = threading.Lock()
+password_queue_slots = threading.BoundedSemaphore(settings.password_hash_queue_size)
 
-def hash(password: str):
+
+def get_password_executor() -> ProcessPoolExecutor | None:
+    global password_executor
+
+    if settings.password_hash_workers <= 0:
+        return None
+
+    with password_executor_lock:
+        if password_executor is None:
+            password_executor = ProcessPoolExecutor(
+                max_workers=settings.password_hash_workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+
+    return password_executor
+
+
+def shutdown_password_executor():
+    global password_executor
+
+    with password_executor_lock:
+        if password_executor is not None:
+            password_executor.shutdown()
+            password_executor = None
+
+
+def run_password_task(fn, *args):
+    executor = get_password_executor()
+    if executor is None:
+        return fn(*args)
+
+    if not password_queue_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Too many concurrent authentication requests, try again shortly.",
+            headers={"Retry-After": "1"},
+        )
+
+    try:
+        return executor.submit(fn, *args).result()
+    finally:
+        password_queue_slots.release()
+
+
+# module level functions so they can be pickled to the worker processes
+def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 
-def verify(plain_password, hashed_password):
+def verify_password(plain_password, hashed_password) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
+
+
+def verify_and_update_password(plain_password, hashed_password):
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def hash(password: str):
+    return run_password_task(hash_password, password)
+
+
+def verify(plain_password, hashed_password):
+    return run_password_task(verify_password, plain_password, hashed_password)
+
+
+def verify_and_update(plain_password, hashed_password):
+    """Returns (valid, new_hash), new_hash is set when the cost has changed."""
+    return run_password_task(
+        verify_and_update_password, plain_password, hashed_password
+    )
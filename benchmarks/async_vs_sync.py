@@ -0,0 +1,136 @@
+"""Throughput of the sync and async database paths at high concurrency.
+
+Starts the API with uvicorn twice, once with DATABASE_ASYNC=false and once
+with DATABASE_ASYNC=true, and drives the same authenticated GET route with
+the same number of concurrent clients against each. Run from the repo root
+with the usual database settings in the environment or .env:
+
+    python -m benchmarks.async_vs_sync --concurrency 200 --requests 5000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import time
+
+import httpx
+
+from benchmarks.server import start_server, stop_server
+
+USER = {
+    "username": "benchmark",
+    "email": "benchmark@example.com",
+    "password": "benchmark-password",
+}
+
+
+def start_api(port: int, database_async: bool) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DATABASE_ASYNC": str(database_async).lower(),
+        "DATABASE_SCHEMA_SYNC": "true",
+    }
+    return start_server(
+        ["-m", "uvicorn", "app.main:app", "--port", str(port), "--no-access-log"],
+        port,
+        env=env,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def seed(base_url: str, posts: int) -> str:
+    """Creates the benchmark user and its posts once, returns a token."""
+    with httpx.Client(base_url=base_url) as client:
+        res = client.post("/login", data=USER)
+        if res.status_code != 200:
+            client.post("/users/", json=USER).raise_for_status()
+            res = client.post("/login", data=USER)
+        token = res.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        existing = client.get("/posts/", params={"limit": posts}, headers=headers)
+        missing = posts - (len(existing.json()) if existing.status_code == 200 else 0)
+        for i in range(missing):
+            client.post(
+                "/posts/",
+                json={"title": f"post {i}", "content": "benchmark", "private": False},
+                headers=headers,
+            )
+
+    return token
+
+
+async def drive(base_url: str, path: str, token: str, requests: int, concurrency: int):
+    latencies = []
+    errors = 0
+    queue = iter(range(requests))
+
+    async def client_loop(client: httpx.AsyncClient):
+        nonlocal errors
+        for _ in queue:
+            start = time.perf_counter()
+            try:
+                res = await client.get(path)
+            except httpx.TransportError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            if res.status_code != 200:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        headers={"Authorization": f"Bearer {token}"},
+        limits=limits,
+        timeout=60,
+    ) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "requests": requests,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(requests / elapsed, 1),
+        "latency_ms": {
+            "p50": round(quantiles[49] * 1000, 2),
+            "p95": round(quantiles[94] * 1000, 2),
+            "p99": round(quantiles[98] * 1000, 2),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", default="/posts/?limit=10")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--posts", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    results = {"path": args.path, "concurrency": args.concurrency}
+    for database_async in (False, True):
+        mode = "async" if database_async else "sync"
+        server = start_api(args.port, database_async)
+        try:
+            base_url = f"http://127.0.0.1:{args.port}"
+            token = seed(base_url, args.posts)
+            results[mode] = asyncio.run(
+                drive(base_url, args.path, token, args.requests, args.concurrency)
+            )
+        finally:
+            stop_server(server)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
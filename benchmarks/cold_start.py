@@ -0,0 +1,91 @@
+"""Cold start time of the API.
+
+Measures, in fresh interpreters, how long `import app.main` takes and how
+long a uvicorn worker takes from launch to answering its first request,
+with and without the startup schema sync. Run from the repo root with the
+usual database settings in the environment or .env:
+
+    python -m benchmarks.cold_start --runs 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+IMPORT_TIMER = """
+import time
+started = time.perf_counter()
+import app.main
+print(time.perf_counter() - started)
+"""
+
+
+def time_import() -> float:
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_TIMER],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.split()[-1])
+
+
+def time_first_response(port: int, schema_sync: bool) -> float:
+    env = {**os.environ, "DATABASE_SCHEMA_SYNC": str(schema_sync).lower()}
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/")
+                return time.perf_counter() - started
+            except httpx.TransportError:
+                if time.perf_counter() - started > 30:
+                    raise RuntimeError(f"server on port {port} did not start")
+                time.sleep(0.005)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def summary(timings: list[float]) -> dict:
+    return {
+        "median_ms": round(statistics.median(timings) * 1000, 1),
+        "min_ms": round(min(timings) * 1000, 1),
+        "max_ms": round(max(timings) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    results = {
+        "runs": args.runs,
+        "import": summary([time_import() for _ in range(args.runs)]),
+        "first_response": summary(
+            [time_first_response(args.port, False) for _ in range(args.runs)]
+        ),
+        "first_response_schema_sync": summary(
+            [time_first_response(args.port, True) for _ in range(args.runs)]
+        ),
+    }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
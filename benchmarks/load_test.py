@@ -0,0 +1,382 @@
+"""Throughput, latency and queries per request of the main routes under load.
+
+Seeds a benchmark dataset straight into the configured database (users,
+posts, votes and a weight history per user), starts the API with uvicorn
+and drives each scenario with concurrent clients. Results are printed as
+JSON so runs can be diffed between versions. Use a database of its own,
+Postgres from the usual settings or SQLite through DATABASE_URL (the
+scenarios here avoid the routes that need Postgres):
+
+    python -m benchmarks.load_test --output before.json
+    DATABASE_URL=sqlite:///./benchmark.db python -m benchmarks.load_test --users 200
+
+The default volume is 2000 users with 1000 days of weights each and 500
+votes each, 2M weight rows and 1M votes. Seeding only happens on the first
+run, later runs with the same --users reuse the data. Posts are dated up to
+the seeding time, once they age out of the feed window (FEED_WINDOW_DAYS)
+posts_list measures the full query instead of the feed.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import httpx
+from sqlalchemy import event, func, insert, select, update
+
+from app import models
+from app.database import Base, get_engine
+from app.feed import rebuild_feed
+from app.oauth2 import create_access_token
+from app.partitions import ensure_partitions
+from app.summary import rebuild_daily_summary
+from app.utils import hash_password
+from benchmarks.server import start_server, stop_server
+
+PASSWORD = "benchmark-password"
+USERNAME = "bench{}"
+
+# last day of the seeded weight histories
+END_DATE = date(2024, 12, 31)
+
+BATCH_SIZE = 10000
+
+SCENARIOS = [
+    "login",
+    "posts_list",
+    "post_detail",
+    "weight_list",
+    "weight_get",
+    "weight_update",
+]
+
+
+def log(message: str):
+    print(message, file=sys.stderr, flush=True)
+
+
+def insert_batches(conn, model, rows):
+    rows = iter(rows)
+    while batch := list(itertools.islice(rows, BATCH_SIZE)):
+        conn.execute(insert(model), batch)
+
+
+def seed(args) -> dict:
+    """Writes the dataset once and returns the ids the scenarios pick from."""
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(0)
+
+    with engine.begin() as conn:
+        users = conn.scalar(
+            select(func.count())
+            .select_from(models.User)
+            .where(models.User.username.like(USERNAME.format("%")))
+        )
+        if users not in (0, args.users):
+            raise SystemExit(
+                f"database holds a benchmark dataset of {users} users, "
+                f"use a fresh database for --users {args.users}"
+            )
+
+        if not users:
+            started = time.perf_counter()
+            # one hash for everyone, bcrypt would dominate the seeding otherwise
+            password = hash_password(PASSWORD)
+            insert_batches(
+                conn,
+                models.User,
+                (
+                    {
+                        "username": USERNAME.format(i),
+                        "email": f"{USERNAME.format(i)}@example.com",
+                        "password": password,
+                    }
+                    for i in range(args.users)
+                ),
+            )
+            user_ids = conn.scalars(
+                select(models.User.id).where(
+                    models.User.username.like(USERNAME.format("%"))
+                )
+            ).all()
+            log(f"seeded {len(user_ids)} users")
+
+            # a minute apart up to now, so the posts are in the feed's window
+            posted = datetime.now(timezone.utc) - timedelta(
+                minutes=args.posts_per_user * args.users
+            )
+            insert_batches(
+                conn,
+                models.Post,
+                (
+                    {
+                        "title": f"post {i} by user {owner_id}",
+                        "content": "benchmark post content " * 20,
+                        "private": i % 5 == 0,
+                        "owner_id": owner_id,
+                        "created_at": posted + timedelta(minutes=i * args.users + n),
+                    }
+                    for n, owner_id in enumerate(user_ids)
+                    for i in range(args.posts_per_user)
+                ),
+            )
+            post_ids = conn.scalars(select(models.Post.id)).all()
+            rebuild_feed(conn)
+            log(f"seeded {len(post_ids)} posts")
+
+            votes = min(args.votes_per_user, len(post_ids))
+            insert_batches(
+                conn,
+                models.Vote,
+                (
+                    {"post_id": post_id, "user_id": user_id}
+                    for user_id in user_ids
+                    for post_id in rng.sample(post_ids, votes)
+                ),
+            )
+            conn.execute(
+                update(models.Post).values(
+                    votes_count=select(func.count())
+                    .where(models.Vote.post_id == models.Post.id)
+                    .scalar_subquery()
+                )
+            )
+            log(f"seeded {votes * len(user_ids)} votes")
+
+            def weights(owner_id):
+                datapoint = rng.randint(60, 110)
+                for day in range(args.days):
+                    datapoint += rng.choice((-1, 0, 0, 1))
+                    yield {
+                        "owner_id": owner_id,
+                        "date": END_DATE - timedelta(days=day),
+                        "datapoint": datapoint,
+                    }
+
+            ensure_partitions(
+                engine,
+                models.Weight.__table__,
+                [END_DATE - timedelta(days=day) for day in range(args.days)],
+            )
+            insert_batches(
+                conn,
+                models.Weight,
+                itertools.chain.from_iterable(weights(id) for id in user_ids),
+            )
+            rebuild_daily_summary(conn)
+            log(
+                f"seeded {args.days * len(user_ids)} weights "
+                f"in {time.perf_counter() - started:.1f}s"
+            )
+
+        user_ids = conn.scalars(
+            select(models.User.id).where(
+                models.User.username.like(USERNAME.format("%"))
+            )
+        ).all()
+        public_post_ids = conn.scalars(
+            select(models.Post.id).where(models.Post.private == False)
+        ).all()
+        days = conn.scalar(
+            select(func.count())
+            .select_from(models.Weight)
+            .where(models.Weight.owner_id == user_ids[0])
+        )
+
+    return {
+        "user_ids": user_ids,
+        "public_post_ids": public_post_ids,
+        "dates": [END_DATE - timedelta(days=day) for day in range(days)],
+    }
+
+
+def serve(port: int):
+    """Runs the API with a query counter, in the server process."""
+    import uvicorn
+    from app.database import get_async_engine
+    from app.main import app
+
+    queries = itertools.count()
+
+    def count_query(*args):
+        next(queries)
+
+    binds = [get_engine()]
+    if async_engine := get_async_engine():
+        binds.append(async_engine.sync_engine)
+    for bind in binds:
+        event.listen(bind, "before_cursor_execute", count_query)
+
+    @app.get("/_benchmark/queries", include_in_schema=False)
+    def get_query_count():
+        # reading a count() advances it, so hand back the value before this
+        return {"queries": next(queries)}
+
+    uvicorn.run(app, port=port, access_log=False, log_level="warning")
+
+
+def scenario_requests(dataset: dict, tokens: list):
+    """Builds a random request for each scenario."""
+
+    def authorized(rng):
+        return {"Authorization": f"Bearer {rng.choice(tokens)}"}
+
+    def login(rng):
+        index = rng.randrange(len(dataset["user_ids"]))
+        return (
+            "POST",
+            "/login",
+            {"data": {"username": USERNAME.format(index), "password": PASSWORD}},
+        )
+
+    def posts_list(rng):
+        return "GET", "/posts/?limit=10", {"headers": authorized(rng)}
+
+    def post_detail(rng):
+        post_id = rng.choice(dataset["public_post_ids"])
+        return "GET", f"/posts/{post_id}", {"headers": authorized(rng)}
+
+    def weight_list(rng):
+        return "GET", "/data/weight/?limit=30", {"headers": authorized(rng)}
+
+    def weight_get(rng):
+        day = rng.choice(dataset["dates"])
+        return "GET", f"/data/weight/{day}", {"headers": authorized(rng)}
+
+    def weight_update(rng):
+        day = rng.choice(dataset["dates"])
+        return (
+            "PUT",
+            f"/data/weight/{day}",
+            {
+                "headers": authorized(rng),
+                "json": {"datapoint": rng.randint(60, 110)},
+            },
+        )
+
+    return {
+        "login": login,
+        "posts_list": posts_list,
+        "post_detail": post_detail,
+        "weight_list": weight_list,
+        "weight_get": weight_get,
+        "weight_update": weight_update,
+    }
+
+
+async def drive(base_url: str, make_request, requests: int, concurrency: int):
+    latencies = []
+    errors = 0
+    queue = iter(range(requests))
+
+    async def client_loop(client: httpx.AsyncClient, rng: random.Random):
+        nonlocal errors
+        for _ in queue:
+            method, url, options = make_request(rng)
+            start = time.perf_counter()
+            try:
+                res = await client.request(method, url, **options)
+            except httpx.TransportError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            if not res.is_success:
+                errors += 1
+
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        limits=httpx.Limits(max_connections=concurrency),
+        timeout=60,
+    ) as client:
+        queries = (await client.get("/_benchmark/queries")).json()["queries"]
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(client_loop(client, random.Random(i)) for i in range(concurrency))
+        )
+        elapsed = time.perf_counter() - start
+        queries = (await client.get("/_benchmark/queries")).json()["queries"] - queries
+    # the second read of the counter advances it once
+    queries -= 1
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "requests": requests,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(requests / elapsed, 1),
+        "latency_ms": {
+            "p50": round(quantiles[49] * 1000, 2),
+            "p95": round(quantiles[94] * 1000, 2),
+            "p99": round(quantiles[98] * 1000, 2),
+        },
+        "queries_per_request": round(queries / requests, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--posts-per-user", type=int, default=5)
+    parser.add_argument("--votes-per-user", type=int, default=500)
+    parser.add_argument("--days", type=int, default=1000)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=2000)
+    # the sync routes share a 40 thread pool with a 15 connection pool by
+    # default, far higher concurrency measures queueing rather than routes
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--output", help="write the results here as well")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve(args.port)
+
+    dataset = seed(args)
+    tokens = [
+        create_access_token({"user_id": user_id})
+        for user_id in dataset["user_ids"][:100]
+    ]
+    make_requests = scenario_requests(dataset, tokens)
+
+    results = {
+        "database": get_engine().dialect.name,
+        "dataset": {
+            "users": len(dataset["user_ids"]),
+            "posts_per_user": args.posts_per_user,
+            "votes_per_user": args.votes_per_user,
+            "days": len(dataset["dates"]),
+        },
+        "concurrency": args.concurrency,
+        "scenarios": {},
+    }
+
+    server = start_server(
+        ["-m", "benchmarks.load_test", "--serve", "--port", str(args.port)], args.port
+    )
+    try:
+        base_url = f"http://127.0.0.1:{args.port}"
+        for name in args.scenarios:
+            log(f"running {name}")
+            results["scenarios"][name] = asyncio.run(
+                drive(base_url, make_requests[name], args.requests, args.concurrency)
+            )
+    finally:
+        stop_server(server)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Cost of rendering large list responses, per serialization path.
+
+Builds PostOut and DataOut rows in memory (no database or server) and
+times turning them into response bytes three ways:
+
+  response_model  FastAPI's handling of a returned list: validate through
+                  the route's response_model, dump to dicts, json.dumps
+  orjson          the same, rendered with ORJSONResponse
+  type_adapter    app.serialization.serialize, one validation and
+                  pydantic-core writes the JSON
+
+Run from the repo root with the usual settings in the environment or .env:
+
+    python -m benchmarks.serialization --rows 100 1000 5000
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import statistics
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta, timezone
+
+from fastapi import Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+
+from app import models
+from app.routers import post
+from app.routers.data_routers import weight
+from app.serialization import data_list_adapter, post_list_adapter, serialize
+
+# same shape as the rows the routes get back from the database
+PostRow = namedtuple("PostRow", ["Post", "votes"])
+DataRow = namedtuple("DataRow", ["datapoint", "date", "created_at", "id"])
+
+NOW = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+
+def post_rows(count: int) -> list:
+    owner = models.User(
+        id=1, username="benchmark", email="benchmark@example.com", created_at=NOW
+    )
+    return [
+        PostRow(
+            models.Post(
+                id=i,
+                title=f"post {i}",
+                content="benchmark content " * 10,
+                private=False,
+                created_at=NOW,
+                owner_id=owner.id,
+                owner=owner,
+            ),
+            i % 7,
+        )
+        for i in range(count)
+    ]
+
+
+def data_rows(count: int) -> list:
+    return [
+        DataRow(80 + i % 5, date(2023, 1, 1) + timedelta(days=i), NOW, i)
+        for i in range(count)
+    ]
+
+
+def response_field(router, name: str):
+    return next(route for route in router.routes if route.name == name).response_field
+
+
+def response_model_path(field, response_class):
+    # serialize_response is a coroutine, reuse one loop so its setup isn't timed
+    loop = asyncio.new_event_loop()
+
+    def render(rows):
+        content = loop.run_until_complete(
+            serialize_response(field=field, response_content=rows, is_coroutine=False)
+        )
+        return response_class(content).body
+
+    return render
+
+
+def type_adapter_path(adapter):
+    def render(rows):
+        return serialize(adapter, rows, Response()).body
+
+    return render
+
+
+def measure(render, rows, repeat: int) -> dict:
+    render(rows)
+    timings = []
+    # like timeit, keep collector pauses out of the timings
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            render(rows)
+            timings.append(time.perf_counter() - started)
+    finally:
+        gc.enable()
+
+    return {
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "min_ms": round(min(timings) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    post_field = response_field(post.router, "get_posts")
+    data_field = response_field(weight.router, "get_weight_list")
+    routes = {
+        "posts": (post_rows, post_field, post_list_adapter),
+        "weights": (data_rows, data_field, data_list_adapter),
+    }
+
+    results = []
+    for name, (make_rows, field, adapter) in routes.items():
+        paths = {
+            "response_model": response_model_path(field, JSONResponse),
+            "orjson": response_model_path(field, ORJSONResponse),
+            "type_adapter": type_adapter_path(adapter),
+        }
+        for count in args.rows:
+            rows = make_rows(count)
+            timings = {
+                path: measure(render, rows, args.repeat)
+                for path, render in paths.items()
+            }
+            baseline = timings["response_model"]["median_ms"]
+            for path, timing in timings.items():
+                timing["speedup"] = round(baseline / timing["median_ms"], 2)
+            results.append({"route": name, "rows": count, **timings})
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Starting and stopping the API in a subprocess for the benchmarks."""
+
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def start_server(args: list[str], port: int, **options) -> subprocess.Popen:
+    """Runs `python <args>` and waits until it answers on port.
+
+    options are passed on to Popen, e.g. env or stderr.
+    """
+    server = subprocess.Popen(
+        [sys.executable, *args], stdout=subprocess.DEVNULL, **options
+    )
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/")
+            return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+
+    stop_server(server)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def stop_server(server: subprocess.Popen):
+    server.terminate()
+    server.wait()
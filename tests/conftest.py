@@ -1,13 +1,20 @@
+from contextlib import contextmanager
+from datetime import date
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 from app import models
 from app.main import app
 from app.config import settings
-from app.database import get_db, Base
-from app.oauth2 import create_access_token
+from app.feed import feed_state_cache, rebuild_feed
+from app.database import get_async_db, get_db, get_read_db, Base
+from app.routers.async_routers import auth, user, post, weight
+from app.oauth2 import create_access_token, token_cache, user_cache
 
 SQLALCHEMY_DATABASE_URL = f"postgresql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}_test"
 
@@ -15,11 +22,17 @@ engine = create_engine(SQLALCHEMY_DATABASE_URL)
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+ASYNC_SQLALCHEMY_DATABASE_URL = f"postgresql+asyncpg://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}_test"
+
 
 @pytest.fixture
 def session():
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    # ids are reused once the tables are recreated
+    token_cache.clear()
+    user_cache.clear()
+    feed_state_cache.clear()
     db = TestingSessionLocal()
     try:
         yield db
@@ -27,6 +40,36 @@ def session():
         db.close()
 
 
+@pytest.fixture
+def assert_queries():
+    """Fails the test if the block runs a different number of statements.
+
+    with assert_queries(1):
+        client.get("/posts/")
+    """
+
+    @contextmanager
+    def assert_query_count(expected: int):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        assert (
+            len(statements) == expected
+        ), f"expected {expected} queries, ran {len(statements)}:\n" + "\n".join(
+            statements
+        )
+
+    return assert_query_count
+
+
 @pytest.fixture
 def client(session):
     def override_get_db():
@@ -36,9 +79,33 @@ def client(session):
             session.close()
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     yield TestClient(app)
 
 
+@pytest.fixture
+def async_client(client):
+    # every TestClient request runs on a fresh event loop, so connections
+    # can't be pooled between requests
+    async_engine = create_async_engine(
+        ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=NullPool
+    )
+    AsyncTestingSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as db:
+            yield db
+
+    async_app = FastAPI()
+    for router in [auth.router, user.router, post.router, weight.router]:
+        async_app.include_router(router)
+    async_app.dependency_overrides[get_async_db] = override_get_async_db
+
+    yield TestClient(async_app)
+
+
 @pytest.fixture
 def test_user(client):
     user_data = {
@@ -121,7 +188,71 @@ def test_posts(test_user, test_user2, session):
     posts = list(post_map)
 
     session.add_all(posts)
+    session.flush()
+    # written around the routes, so the feed is filled in here
+    rebuild_feed(session)
     session.commit()
 
     posts = session.query(models.Post).all()
     return posts
+
+
+@pytest.fixture
+def test_weights(test_user, test_user2, session):
+    # 10 consecutive days of weights for test_user and 2 for test_user2
+    weights_data = [
+        {"datapoint": 80 + day, "date": date(2023, 1, day), "owner_id": test_user["id"]}
+        for day in range(1, 11)
+    ]
+    weights_data += [
+        {"datapoint": 70, "date": date(2023, 1, 1), "owner_id": test_user2["id"]},
+        {"datapoint": 71, "date": date(2023, 1, 2), "owner_id": test_user2["id"]},
+    ]
+
+    session.add_all([models.Weight(**weight) for weight in weights_data])
+    session.commit()
+
+    weights = session.query(models.Weight).all()
+    return weights
+
+
+@pytest.fixture
+def test_vote(test_posts, test_user, session):
+    # test_user votes on test_user2's first public post
+    new_vote = models.Vote(post_id=test_posts[12].id, user_id=test_user["id"])
+    session.add(new_vote)
+    test_posts[12].votes_count += 1
+    session.commit()
+
+
+@pytest.fixture
+def test_data(test_weights, test_user, session):
+    # calories, steps and exercise for test_user on top of test_weights
+    session.add_all(
+        [
+            models.Calorie(
+                datapoint=2500, date=date(2023, 1, 1), owner_id=test_user["id"]
+            ),
+            models.Calorie(
+                datapoint=2300, date=date(2023, 1, 2), owner_id=test_user["id"]
+            ),
+            models.Step(
+                datapoint=10000, date=date(2023, 1, 1), owner_id=test_user["id"]
+            ),
+            models.Exercise(
+                name="squat",
+                weight=100,
+                reps=5,
+                date=date(2023, 1, 1),
+                owner_id=test_user["id"],
+            ),
+            models.Exercise(
+                name="squat",
+                weight=105,
+                reps=3,
+                date=date(2023, 1, 1),
+                owner_id=test_user["id"],
+            ),
+        ]
+    )
+    session.commit()
@@ -0,0 +1,153 @@
+import pytest
+from fastapi import FastAPI
+from app import models, schemas
+from app.main import use_async_routes
+from app.routers import data, post
+from app.routers.data_routers import weight
+from app.routers.async_routers import post as async_post, weight as async_weight
+
+
+@pytest.fixture
+def async_authorized_client(async_client, token):
+    async_client.headers = {**async_client.headers, "Authorization": f"Bearer {token}"}
+
+    return async_client
+
+
+def test_use_async_routes():
+    app = FastAPI()
+    app.include_router(data.router)
+    app.include_router(post.router)
+    paths = [route.path for route in app.routes]
+
+    use_async_routes(app, [async_post.router, async_weight.router])
+    endpoints = {(route.path, *route.methods): route.endpoint for route in app.routes}
+
+    assert [route.path for route in app.routes] == paths
+    assert endpoints[("/posts/", "GET")] is async_post.get_posts
+    assert endpoints[("/data/weight/{date}", "PUT")] is async_weight.update_weight
+    # routes without an async version stay on the sync path
+    bulk = next(
+        route for route in weight.router.routes if route.name == "add_weight_bulk"
+    )
+    assert endpoints[("/data/weight/bulk", "POST")] is bulk.endpoint
+
+
+def test_async_create_user_and_login(async_client):
+    res = async_client.post(
+        "/users/",
+        json={"username": "test", "email": "test@gmail.com", "password": "password123"},
+    )
+    assert res.status_code == 201
+
+    res = async_client.post(
+        "/login", data={"username": "test", "password": "password123"}
+    )
+    assert res.status_code == 200
+    assert schemas.Token(**res.json()).token_type == "bearer"
+
+
+def test_async_get_posts_not_logged_in(async_client):
+    res = async_client.get("/posts/")
+
+    assert res.status_code == 401
+
+
+def test_async_get_posts(async_authorized_client, test_posts):
+    res = async_authorized_client.get("/posts/?limit=24")
+
+    posts_list = [schemas.PostOut(**post) for post in res.json()]
+
+    assert len(posts_list) == 18
+    assert res.status_code == 200
+
+
+def test_async_get_posts_reads_feed(async_authorized_client, test_posts, session):
+    # the newest visible post, missing from the feed it only shows up
+    # through the full query
+    session.query(models.FeedPost).filter(
+        models.FeedPost.post_id
+        == next(post.id for post in test_posts if post.title == "6th - u2 pub")
+    ).delete()
+    session.commit()
+
+    res = async_authorized_client.get("/posts/?limit=5")
+
+    assert "6th - u2 pub" not in [post["Post"]["title"] for post in res.json()]
+
+
+@pytest.mark.parametrize(
+    "post_id, status_code",
+    [(1, 200), (19, 401), (9999, 404)],
+)
+def test_async_get_post(async_authorized_client, test_posts, post_id, status_code):
+    res = async_authorized_client.get(f"/posts/{post_id}")
+
+    assert res.status_code == status_code
+
+
+def test_async_create_update_delete_post(async_authorized_client, test_user):
+    res = async_authorized_client.post(
+        "/posts/", json={"title": "title", "content": "content"}
+    )
+    created_post = schemas.Post(**res.json())
+    assert res.status_code == 201
+    assert created_post.owner.username == test_user["username"]
+
+    res = async_authorized_client.put(
+        f"/posts/{created_post.id}",
+        json={"title": "updated title", "content": "updated content"},
+    )
+    assert res.status_code == 200
+    assert schemas.Post(**res.json()).title == "updated title"
+
+    res = async_authorized_client.delete(f"/posts/{created_post.id}")
+    assert res.status_code == 204
+
+
+def test_async_weight_crud(async_authorized_client):
+    res = async_authorized_client.post(
+        "/data/weight/", json={"datapoint": 80, "date": "2023-02-01"}
+    )
+    assert res.status_code == 201
+
+    res = async_authorized_client.post(
+        "/data/weight/", json={"datapoint": 80, "date": "2023-02-01"}
+    )
+    assert res.status_code == 400
+
+    res = async_authorized_client.put("/data/weight/2023-02-01", json={"datapoint": 81})
+    assert res.status_code == 200
+    assert res.json()["datapoint"] == 81
+
+    res = async_authorized_client.get("/data/weight/2023-02-01")
+    assert res.status_code == 200
+
+    res = async_authorized_client.get("/data/weight/")
+    assert len(res.json()) == 1
+
+    res = async_authorized_client.delete("/data/weight/2023-02-01")
+    assert res.status_code == 204
+
+    res = async_authorized_client.delete("/data/weight/2023-02-01")
+    assert res.status_code == 404
+
+
+def test_async_get_weights_max_points(async_authorized_client, test_weights):
+    res = async_authorized_client.get(
+        "/data/weight/", params={"start": "2023-01-02", "max_points": 3}
+    )
+
+    dates = [weight["date"] for weight in res.json()]
+
+    assert len(dates) == 3
+    assert (dates[0], dates[-1]) == ("2023-01-10", "2023-01-02")
+
+
+def test_async_get_weights_no_cursor_on_exact_page(
+    async_authorized_client, test_weights
+):
+    res = async_authorized_client.get("/data/weight/?limit=10")
+
+    assert len(res.json()) == 10
+    assert "X-Next-Cursor" not in res.headers
@@ -1,6 +1,8 @@
 import pytest
+from threading import BoundedSemaphore
 from jose import jwt
-from app import schemas
+from passlib.context import CryptContext
+from app import schemas, models, utils
 from app.config import settings
 from datetime import datetime, timedelta
 
@@ -40,3 +42,42 @@ def test_login_invalid(client, test_user, username, password):
     )
 
     assert res.status_code == 403
+
+
+def test_login_rehashes_on_cost_change(client, session):
+    old_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4)
+    session.add(
+        models.User(
+            username="old",
+            email="old@gmail.com",
+            password=old_context.hash("password123"),
+        )
+    )
+    session.commit()
+
+    res = client.post("/login", data={"username": "old", "password": "password123"})
+
+    assert res.status_code == 200
+    user = session.query(models.User).filter(models.User.username == "old").one()
+    session.refresh(user)
+    assert not utils.pwd_context.needs_update(user.password)
+    assert utils.verify("password123", user.password)
+
+
+def test_login_password_queue_full(client, test_user, monkeypatch):
+    monkeypatch.setattr(utils, "password_queue_slots", BoundedSemaphore(1))
+    utils.password_queue_slots.acquire()
+
+    res = client.post(
+        "/login",
+        data={"username": test_user["username"], "password": test_user["password"]},
+    )
+
+    assert res.status_code == 503
+
+
+def test_password_hashing_inline(monkeypatch):
+    monkeypatch.setattr(settings, "password_hash_workers", 0)
+
+    assert utils.get_password_executor() is None
+    assert utils.verify("password123", utils.hash("password123"))
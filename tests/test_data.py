@@ -0,0 +1,264 @@
+import csv
+import io
+import json
+import time
+from datetime import date, datetime
+from threading import Thread
+import pytest
+from sqlalchemy import text
+from app import models, schemas
+from app.summary import rebuild_daily_summary, summary_writes
+from .conftest import TestingSessionLocal, engine
+
+
+def test_export_data_unauthorized(client):
+    res = client.get("/data/export")
+
+    assert res.status_code == 401
+
+
+def test_export_data_ndjson(authorized_client, test_data):
+    res = authorized_client.get("/data/export")
+
+    rows = [json.loads(line) for line in res.text.splitlines()]
+
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/x-ndjson"
+    # test_user2's weights are not included
+    assert len(rows) == 15
+    assert [row["metric"] for row in rows].count("weight") == 10
+    assert rows[0] == {
+        "metric": "weight",
+        "date": "2023-01-01",
+        "datapoint": 81,
+        "name": None,
+        "reps": None,
+        "created_at": rows[0]["created_at"],
+    }
+    assert rows[-1]["name"] == "squat"
+    assert rows[-1]["datapoint"] == 105
+    assert datetime.fromisoformat(rows[0]["created_at"]).tzinfo is not None
+    assert "T" in rows[0]["created_at"]
+
+
+def test_export_data_csv(authorized_client, test_data):
+    res = authorized_client.get("/data/export?format=csv")
+
+    rows = list(csv.DictReader(io.StringIO(res.text)))
+
+    assert res.status_code == 200
+    assert len(rows) == 15
+    assert rows[10]["metric"] == "calories"
+    assert rows[10]["datapoint"] == "2500.0"
+    assert "T" in rows[10]["created_at"]
+
+
+def test_export_data_parquet(authorized_client, test_data):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    res = authorized_client.get("/data/export?format=parquet")
+
+    table = pq.read_table(io.BytesIO(res.content))
+
+    assert res.status_code == 200
+    assert table.num_rows == 15
+    assert table.column("metric").to_pylist().count("exercise") == 2
+
+
+def test_export_data_empty(authorized_client):
+    res = authorized_client.get("/data/export?format=csv")
+
+    assert res.status_code == 200
+    assert res.text.splitlines() == ["metric,date,datapoint,name,reps,created_at"]
+
+
+def test_get_data_unauthorized(client):
+    res = client.get("/data/")
+
+    assert res.status_code == 401
+
+
+def test_get_data(authorized_client, test_data):
+    res = authorized_client.get("/data/")
+
+    data = schemas.AllData(**res.json())
+
+    assert res.status_code == 200
+    assert len(data.weight_data) == 10
+    assert [entry.datapoint for entry in data.calories_data] == [2500, 2300]
+    assert len(data.steps_data) == 1
+    assert sorted((entry.name, entry.reps) for entry in data.exercise_data) == [
+        ("squat", 3),
+        ("squat", 5),
+    ]
+
+
+def test_get_data_date_window(authorized_client, test_data):
+    res = authorized_client.get(
+        "/data/", params={"start": "2023-01-02", "end": "2023-01-05"}
+    )
+
+    data = schemas.AllData(**res.json())
+
+    assert [str(entry.date) for entry in data.weight_data] == [
+        "2023-01-02",
+        "2023-01-03",
+        "2023-01-04",
+        "2023-01-05",
+    ]
+    assert len(data.calories_data) == 1
+    assert data.steps_data == []
+    assert data.exercise_data == []
+
+
+def summary(client, **params) -> dict:
+    res = client.get("/data/summary", params=params)
+    assert res.status_code == 200
+    return {row.pop("date"): row for row in res.json()}
+
+
+def test_summary_follows_writes(authorized_client):
+    for route, entry in [
+        ("weight", {"date": "2023-01-01", "datapoint": 80}),
+        ("calories", {"date": "2023-01-01", "datapoint": 2500}),
+        ("steps", {"date": "2023-01-01", "datapoint": 10000}),
+        (
+            "exercise",
+            {"date": "2023-01-01", "datapoint": 100, "name": "squat", "reps": 5},
+        ),
+        (
+            "exercise",
+            {"date": "2023-01-01", "datapoint": 105, "name": "squat", "reps": 3},
+        ),
+    ]:
+        assert authorized_client.post(f"/data/{route}/", json=entry).status_code == 201
+
+    assert summary(authorized_client) == {
+        "2023-01-01": {
+            "weight": 80,
+            "calories": 2500,
+            "steps": 10000,
+            "exercise_sets": 2,
+            "exercise_volume": 815,
+        }
+    }
+
+    authorized_client.put("/data/weight/2023-01-01", json={"datapoint": 79})
+    authorized_client.delete("/data/calories/2023-01-01")
+
+    day = summary(authorized_client)["2023-01-01"]
+    assert (day["weight"], day["calories"]) == (79, None)
+
+
+def test_summary_exercise_moved_to_another_day(authorized_client):
+    res = authorized_client.post(
+        "/data/exercise/",
+        json={"date": "2023-01-01", "datapoint": 100, "name": "squat", "reps": 5},
+    )
+    exercise_id = res.json()["id"]
+
+    authorized_client.put(
+        f"/data/exercise/{exercise_id}",
+        json={"date": "2023-01-02", "datapoint": 100, "name": "squat", "reps": 4},
+    )
+
+    days = summary(authorized_client)
+    # the emptied day goes
+    assert "2023-01-01" not in days
+    assert days["2023-01-02"]["exercise_sets"] == 1
+    assert days["2023-01-02"]["exercise_volume"] == 400
+
+
+def test_summary_day_dropped_once_empty(authorized_client):
+    authorized_client.post(
+        "/data/weight/", json={"date": "2023-01-01", "datapoint": 80}
+    )
+    authorized_client.post(
+        "/data/steps/", json={"date": "2023-01-01", "datapoint": 9000}
+    )
+
+    authorized_client.delete("/data/weight/2023-01-01")
+    assert summary(authorized_client)["2023-01-01"]["steps"] == 9000
+
+    authorized_client.delete("/data/steps/2023-01-01")
+    assert summary(authorized_client) == {}
+
+
+def blocked_on_lock() -> bool:
+    with engine.connect() as conn:
+        return bool(
+            conn.scalar(
+                text(
+                    "SELECT count(*) FROM pg_stat_activity"
+                    " WHERE wait_event_type = 'Lock' AND datname = current_database()"
+                )
+            )
+        )
+
+
+def test_summary_concurrent_sets(test_user, session):
+    # two transactions logging a set on the same day, the second waiting on
+    # the first's summary row
+    sets = [{"date": date(2023, 1, 1), "datapoint": 100, "reps": 5}]
+    first, second = TestingSessionLocal(), TestingSessionLocal()
+
+    def log_set(db):
+        for stmt in summary_writes(db, models.Exercise, test_user["id"], sets):
+            db.execute(stmt)
+        db.commit()
+
+    try:
+        for stmt in summary_writes(first, models.Exercise, test_user["id"], sets):
+            first.execute(stmt)
+        waiting = Thread(target=log_set, args=(second,))
+        waiting.start()
+        while waiting.is_alive() and not blocked_on_lock():
+            time.sleep(0.01)
+        first.commit()
+        waiting.join()
+    finally:
+        first.close()
+        second.close()
+
+    day = session.get(models.DailySummary, (test_user["id"], date(2023, 1, 1)))
+    session.refresh(day)
+    assert (day.exercise_sets, day.exercise_volume) == (2, 1000)
+
+
+def test_summary_bulk_and_range(authorized_client):
+    authorized_client.post(
+        "/data/weight/bulk",
+        json={
+            "data": [
+                {"date": f"2023-01-0{day}", "datapoint": 80 + day}
+                for day in range(1, 6)
+            ]
+        },
+    )
+
+    days = summary(authorized_client, start="2023-01-02", end="2023-01-04")
+
+    assert {day: row["weight"] for day, row in days.items()} == {
+        "2023-01-02": 82,
+        "2023-01-03": 83,
+        "2023-01-04": 84,
+    }
+
+
+def test_rebuild_daily_summary(authorized_client, test_data, session):
+    # fixtures write the metric tables directly, around the summary
+    assert summary(authorized_client) == {}
+
+    rebuild_daily_summary(session.connection())
+    session.commit()
+
+    days = summary(authorized_client)
+    assert len(days) == 10
+    assert days["2023-01-01"] == {
+        "weight": 81,
+        "calories": 2500,
+        "steps": 10000,
+        "exercise_sets": 2,
+        "exercise_volume": 815,
+    }
+    assert days["2023-01-02"]["calories"] == 2300
@@ -0,0 +1,26 @@
+from app.downsample import lttb
+
+
+def downsample(values, max_points):
+    return lttb(list(enumerate(values)), max_points, x=lambda p: p[0], y=lambda p: p[1])
+
+
+def test_lttb_keeps_ends_and_peaks():
+    values = [80] * 50
+    values[17] = 95
+    values[33] = 60
+
+    kept = downsample(values, 6)
+
+    assert len(kept) == 6
+    assert kept[0] == (0, 80)
+    assert kept[-1] == (49, 80)
+    assert (17, 95) in kept
+    assert (33, 60) in kept
+
+
+def test_lttb_short_series_unchanged():
+    values = [1, 5, 3]
+
+    assert downsample(values, 3) == list(enumerate(values))
+    assert downsample(values, 10) == list(enumerate(values))
@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+from fastapi import Response
+from pydantic import ValidationError
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import inspect
+from app import main, utils
+from app.config import Settings
+from app.serialization import data_list_adapter, serialize
+from app.database import Base
+from .conftest import engine
+
+
+def test_import_without_database():
+    # nothing connects until the first request, so an unreachable database
+    # doesn't stop the app from loading
+    env = {**os.environ, "DATABASE_HOSTNAME": "unreachable.invalid"}
+    result = subprocess.run(
+        [sys.executable, "-c", "import app.main"],
+        env=env,
+        capture_output=True,
+        timeout=30,
+    )
+
+    assert result.returncode == 0, result.stderr
+
+
+def test_lifespan_schema_sync(monkeypatch):
+    Base.metadata.drop_all(bind=engine)
+    monkeypatch.setattr(main.settings, "database_schema_sync", True)
+    monkeypatch.setattr(main, "get_engine", lambda: engine)
+
+    with TestClient(main.app):
+        assert "posts" in inspect(engine).get_table_names()
+
+
+def test_lifespan_without_schema_sync(monkeypatch):
+    Base.metadata.drop_all(bind=engine)
+    monkeypatch.setattr(main, "get_engine", lambda: engine)
+
+    with TestClient(main.app):
+        assert "posts" not in inspect(engine).get_table_names()
+
+
+def test_lifespan_shuts_down_password_workers(monkeypatch):
+    monkeypatch.setattr(utils.settings, "password_hash_workers", 1)
+
+    with TestClient(main.app):
+        executor = utils.get_password_executor()
+        assert utils.hash("password123")
+        assert executor._mp_context.get_start_method() == "forkserver"
+
+    assert utils.password_executor is None
+    assert executor._shutdown_thread
+
+
+def test_serialize_keeps_repeated_headers():
+    response = Response()
+    response.set_cookie("a", "1")
+    response.set_cookie("b", "2")
+
+    rendered = serialize(data_list_adapter, [], response)
+
+    assert rendered.body == b"[]"
+    assert [value for name, value in rendered.raw_headers if name == b"set-cookie"] == [
+        value for name, value in response.raw_headers if name == b"set-cookie"
+    ]
+    assert len(rendered.headers.getlist("set-cookie")) == 2
+
+
+def test_async_needs_postgres_database_url():
+    with pytest.raises(ValidationError):
+        Settings(database_url="sqlite:///./fitness.db", database_async=True)
+
+    assert Settings(database_url="postgresql://u:p@db/fitness", database_async=True)
@@ -0,0 +1,109 @@
+import pytest
+from app import schemas
+from app.oauth2 import create_access_token
+
+
+@pytest.mark.parametrize("metric", ["calories", "steps", "exercise"])
+def test_get_metric_not_logged_in(client, metric):
+    res = client.get(f"/data/{metric}/")
+
+    assert res.status_code == 401
+
+
+@pytest.mark.parametrize("metric, count", [("calories", 2), ("steps", 1)])
+def test_get_metric(authorized_client, test_data, metric, count):
+    res = authorized_client.get(f"/data/{metric}/")
+
+    data = [schemas.DataOut(**entry) for entry in res.json()]
+
+    assert res.status_code == 200
+    assert len(data) == count
+
+
+def test_calories_crud(authorized_client):
+    res = authorized_client.post(
+        "/data/calories/", json={"datapoint": 2400, "date": "2023-03-01"}
+    )
+    assert res.status_code == 201
+
+    res = authorized_client.post(
+        "/data/calories/", json={"datapoint": 2000, "date": "2023-03-01"}
+    )
+    assert res.status_code == 400
+
+    res = authorized_client.put("/data/calories/2023-03-01", json={"datapoint": 2600})
+    assert res.status_code == 200
+    assert res.json()["datapoint"] == 2600
+
+    res = authorized_client.get("/data/calories/2023-03-01")
+    assert res.json()["datapoint"] == 2600
+
+    res = authorized_client.delete("/data/calories/2023-03-01")
+    assert res.status_code == 204
+
+    res = authorized_client.get("/data/calories/2023-03-01")
+    assert res.status_code == 404
+
+
+def test_steps_bulk(authorized_client, test_data):
+    res = authorized_client.post(
+        "/data/steps/bulk",
+        json={
+            "data": [
+                {"datapoint": 8000, "date": "2023-01-01"},
+                {"datapoint": 9000, "date": "2023-01-02"},
+            ],
+            "on_conflict": "skip",
+        },
+    )
+
+    assert res.status_code == 201
+    assert res.json() == {
+        "inserted": 1,
+        "updated": 0,
+        "skipped": 1,
+        "conflicts": ["2023-01-01"],
+    }
+
+
+def test_get_exercise(authorized_client, test_data):
+    res = authorized_client.get("/data/exercise/")
+
+    sets = [schemas.ExerciseOut(**entry) for entry in res.json()]
+
+    assert res.status_code == 200
+    assert sorted(entry.reps for entry in sets) == [3, 5]
+
+
+def test_exercise_crud(authorized_client, test_data):
+    # a second set on the same day is a new row, not a conflict
+    res = authorized_client.post(
+        "/data/exercise/",
+        json={"name": "squat", "datapoint": 110, "reps": 1, "date": "2023-01-01"},
+    )
+    assert res.status_code == 201
+    exercise_id = res.json()["id"]
+    assert authorized_client.get(f"/data/exercise/{exercise_id}").status_code == 200
+
+    res = authorized_client.put(
+        f"/data/exercise/{exercise_id}",
+        json={"name": "squat", "datapoint": 112.5, "reps": 1, "date": "2023-01-01"},
+    )
+    assert res.status_code == 200
+    assert res.json()["datapoint"] == 112.5
+
+    res = authorized_client.delete(f"/data/exercise/{exercise_id}")
+    assert res.status_code == 204
+
+    res = authorized_client.get(f"/data/exercise/{exercise_id}")
+    assert res.status_code == 404
+
+
+def test_exercise_other_user(client, test_data, test_user2):
+    # test_data belongs to test_user
+    token = create_access_token({"user_id": test_user2["id"]})
+    client.headers = {**client.headers, "Authorization": f"Bearer {token}"}
+
+    res = client.get("/data/exercise/")
+
+    assert res.status_code == 404
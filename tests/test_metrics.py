@@ -0,0 +1,92 @@
+import pytest
+from sqlalchemy import create_engine, exc
+from app.config import settings
+from app.instrumentation import request_metrics
+from app.pool import InstrumentedQueuePool, pool_status
+from .conftest import SQLALCHEMY_DATABASE_URL
+
+
+def test_get_pool_metrics(client):
+    res = client.get("/metrics/pool")
+
+    assert res.status_code == 200
+    assert {"size", "checked_out", "idle", "overflow", "checkouts"} <= set(
+        res.json()["primary"]
+    )
+
+
+def test_instrumented_pool_checkout_metrics():
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.1,
+    )
+
+    with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+        status = pool_status(engine.pool)
+
+    assert status["size"] == 1
+    assert status["checked_out"] == 1
+    assert status["checkouts"] == 2
+    assert status["timeouts"] == 1
+    assert status["wait_seconds_max"] >= 0.1
+    assert pool_status(engine.pool)["idle"] == 1
+
+    engine.dispose()
+
+
+def test_get_metrics(authorized_client, test_weights):
+    request_metrics.clear()
+    authorized_client.get("/data/weight/")
+    authorized_client.get("/data/weight/")
+
+    res = authorized_client.get("/metrics")
+    labels = 'method="GET",route="/data/weight/"'
+
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert f'http_requests_total{{{labels},status="200"}} 2' in res.text
+    assert f"http_request_duration_seconds_count{{{labels}}} 2" in res.text
+    # the user is looked up once, then served from the auth cache
+    assert f"http_request_queries_sum{{{labels}}} 3" in res.text
+
+
+def test_get_metrics_unmatched_route(client):
+    request_metrics.clear()
+    client.get("/missing/route")
+
+    res = client.get("/metrics")
+
+    assert 'route="unmatched",status="404"' in res.text
+
+
+def test_server_timing(authorized_client, test_weights, monkeypatch):
+    monkeypatch.setattr(settings, "server_timing", True)
+
+    res = authorized_client.get("/data/weight/")
+
+    assert res.headers["Server-Timing"].startswith("db;dur=")
+    assert 'desc="2 queries"' in res.headers["Server-Timing"]
+
+
+def test_server_timing_disabled(authorized_client, test_weights):
+    res = authorized_client.get("/data/weight/")
+
+    assert "Server-Timing" not in res.headers
+
+
+def test_get_metrics_auth_caches(authorized_client, test_weights):
+    authorized_client.get("/data/weight/")
+    authorized_client.get("/data/weight/")
+
+    res = authorized_client.get("/metrics")
+
+    # looked up once, then served from the cache
+    assert 'cache_hits_total{cache="user"} 1' in res.text
+    assert 'cache_misses_total{cache="user"} 1' in res.text
+    assert 'cache_size{cache="token"} 1' in res.text
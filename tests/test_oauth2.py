@@ -0,0 +1,58 @@
+import time
+from app import models, oauth2
+from app.cache import TTLCache
+
+
+def test_ttl_cache_expiry():
+    cache = TTLCache(max_size=10)
+    cache.set("live", 1, expires_at=time.time() + 60)
+    cache.set("expired", 2, expires_at=time.time() - 1)
+
+    assert cache.get("live") == 1
+    assert cache.get("expired") is None
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+
+def test_ttl_cache_lru_eviction():
+    cache = TTLCache(max_size=2)
+    expires_at = time.time() + 60
+    cache.set("a", 1, expires_at)
+    cache.set("b", 2, expires_at)
+    cache.get("a")
+    cache.set("c", 3, expires_at)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_current_user_cached(authorized_client, test_user):
+    authorized_client.get("/posts/")
+    misses = oauth2.user_cache.misses
+
+    res = authorized_client.get("/posts/")
+
+    assert res.status_code == 404
+    assert oauth2.user_cache.misses == misses
+    assert oauth2.user_cache.hits >= 1
+
+
+def test_current_user_cache_invalidated(authorized_client, test_user, session):
+    authorized_client.get("/posts/")
+    assert oauth2.user_cache.get(test_user["id"]) is not None
+
+    user = session.query(models.User).filter(models.User.id == test_user["id"]).one()
+    user.username = "renamed"
+    session.commit()
+
+    assert oauth2.user_cache.get(test_user["id"]) is None
+
+
+def test_deleted_user_rejected(authorized_client, test_user, session):
+    user = session.query(models.User).filter(models.User.id == test_user["id"]).one()
+    session.delete(user)
+    session.commit()
+
+    res = authorized_client.get("/posts/")
+
+    assert res.status_code == 401
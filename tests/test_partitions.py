@@ -0,0 +1,119 @@
+import json
+import os
+import subprocess
+import sys
+from .conftest import SQLALCHEMY_DATABASE_URL
+
+# partitioning is decided when the models are imported, so the app runs in
+# a fresh interpreter with it switched on
+PARTITIONED_APP = """
+import json
+from datetime import date
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, select, text
+from app import models
+from app.crud import metric_rows
+from app.database import Base, get_engine
+from app.main import app
+from app.oauth2 import create_access_token
+
+engine = get_engine()
+Base.metadata.drop_all(bind=engine)
+Base.metadata.create_all(bind=engine)
+with engine.begin() as conn:
+    user_id = conn.scalar(
+        insert(models.User)
+        .values(username="test", email="test@gmail.com", password="x")
+        .returning(models.User.id)
+    )
+
+client = TestClient(app)
+client.headers["Authorization"] = f"Bearer {create_access_token({'user_id': user_id})}"
+exercise = client.post(
+    "/data/exercise/",
+    json={"date": "2023-05-01", "datapoint": 100, "name": "squat", "reps": 5},
+)
+exercise_id = exercise.json()["id"]
+statuses = [
+    client.post("/data/weight/", json={"date": "2023-05-01", "datapoint": 80}).status_code,
+    client.post(
+        "/data/weight/bulk",
+        json={"data": [{"date": "2024-01-01", "datapoint": 81}, {"date": "2025-01-01", "datapoint": 82}]},
+    ).status_code,
+    exercise.status_code,
+]
+statuses.append(
+    client.put(
+        f"/data/exercise/{exercise_id}",
+        json={"date": "2026-02-01", "datapoint": 100, "name": "squat", "reps": 5},
+    ).status_code
+)
+
+# dropped behind the worker's back, it still has 2024 cached
+with engine.begin() as conn:
+    conn.execute(text("DROP TABLE weights_y2024"))
+statuses.append(
+    client.post("/data/weight/", json={"date": "2024-06-01", "datapoint": 83}).status_code
+)
+
+with engine.connect() as conn:
+    partitions = conn.scalars(
+        text(
+            "SELECT inhrelid::regclass::text FROM pg_inherits "
+            "WHERE inhparent IN ('weights'::regclass, 'exercise'::regclass) ORDER BY 1"
+        )
+    ).all()
+    plan = conn.scalars(
+        text("EXPLAIN " + str(
+            metric_rows("weight", user_id, date(2024, 1, 1), date(2024, 12, 31))
+            .compile(engine, compile_kwargs={"literal_binds": True})
+        ))
+    ).all()
+
+print(json.dumps({
+    "statuses": statuses,
+    "partitions": partitions,
+    "plan": "\\n".join(plan),
+    "weights": client.get("/data/weight/").json(),
+}))
+"""
+
+
+def run_partitioned_app() -> dict:
+    env = {
+        **os.environ,
+        "DATABASE_URL": SQLALCHEMY_DATABASE_URL,
+        "DATABASE_PARTITION_METRICS": "true",
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", PARTITIONED_APP],
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_partitions_created_on_write():
+    result = run_partitioned_app()
+
+    assert result["statuses"] == [201, 201, 201, 200, 201]
+    assert result["partitions"] == [
+        "exercise_y2023",
+        "exercise_y2026",
+        "weights_y2023",
+        "weights_y2024",
+        "weights_y2025",
+    ]
+    # the dropped partition took 2024-01-01 with it, and was recreated
+    assert [weight["date"] for weight in result["weights"]] == [
+        "2025-01-01",
+        "2024-06-01",
+        "2023-05-01",
+    ]
+    # a date range only scans the partitions it overlaps
+    assert "weights_y2024" in result["plan"]
+    assert "weights_y2023" not in result["plan"]
+    assert "weights_y2025" not in result["plan"]
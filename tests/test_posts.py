@@ -1,5 +1,8 @@
 import pytest
-from app import schemas
+from app import feed, models, schemas
+from app.config import settings
+from app.oauth2 import create_access_token
+from .conftest import engine
 
 
 def test_get_posts_not_logged_in(client):
@@ -290,3 +293,318 @@ def test_update_post_other_owner(authorized_client, test_posts):
     )
 
     assert res.status_code == 403
+
+
+def test_get_posts_cursor(authorized_client, test_posts):
+    post_ids = []
+    cursor = None
+    while True:
+        params = {"limit": 5}
+        if cursor:
+            params["cursor"] = cursor
+        res = authorized_client.get("/posts/", params=params)
+        assert res.status_code == 200
+
+        post_ids += [schemas.PostOut(**post).Post.id for post in res.json()]
+        cursor = res.headers.get("X-Next-Cursor")
+        if len(res.json()) < 5:
+            assert cursor is None
+            break
+
+    assert len(post_ids) == 18
+    assert post_ids == sorted(post_ids, reverse=True)
+
+
+@pytest.mark.parametrize("own, page_sizes", [(False, [6, 6, 6]), (True, [6, 6])])
+def test_get_posts_no_cursor_on_exact_last_page(
+    authorized_client, test_posts, test_user, own, page_sizes
+):
+    # 18 visible posts, 12 of them test_user's, both multiples of 6
+    params = {"limit": 6, **({"owner_id": test_user["id"]} if own else {})}
+    res = authorized_client.get("/posts/", params=params)
+    pages = [len(res.json())]
+    while "X-Next-Cursor" in res.headers:
+        params["cursor"] = res.headers["X-Next-Cursor"]
+        res = authorized_client.get("/posts/", params=params)
+        pages.append(len(res.json()))
+
+    assert res.status_code == 200
+    assert pages == page_sizes
+
+
+def test_get_posts_invalid_cursor(authorized_client, test_posts):
+    res = authorized_client.get("/posts/?cursor=invalid")
+
+    assert res.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "search, return_length",
+    [
+        ("pub", 12),
+        ("u2 pub", 6),
+        ('"u1 pri"', 6),
+        ("test_content", 18),
+        ("missing", 0),
+    ],
+)
+def test_get_posts_fulltext_search(
+    authorized_client, test_posts, search, return_length
+):
+    res = authorized_client.get(
+        "/posts/", params={"search": search, "search_mode": "fulltext", "limit": 24}
+    )
+
+    if return_length == 0:
+        assert res.status_code == 404
+        return
+
+    posts_list = [schemas.PostOut(**post) for post in res.json()]
+
+    assert len(posts_list) == return_length
+    assert res.status_code == 200
+
+
+def test_get_posts_fulltext_search_ranked(authorized_client, test_user):
+    for title, content in [
+        ("leg day", "warm up then squats"),
+        ("squats", "squats, squats and more squats"),
+    ]:
+        authorized_client.post("/posts/", json={"title": title, "content": content})
+
+    res = authorized_client.get(
+        "/posts/", params={"search": "squat", "search_mode": "fulltext"}
+    )
+
+    assert [post["Post"]["title"] for post in res.json()] == ["squats", "leg day"]
+
+
+def test_get_post_not_modified(authorized_client, test_posts):
+    post_id = test_posts[0].id
+    res = authorized_client.get(f"/posts/{post_id}")
+    etag = res.headers["ETag"]
+
+    res = authorized_client.get(f"/posts/{post_id}", headers={"If-None-Match": etag})
+
+    assert res.status_code == 304
+    assert res.content == b""
+    assert res.headers["ETag"] == etag
+
+
+def test_get_post_if_modified_since(authorized_client, test_posts):
+    post_id = test_posts[0].id
+    res = authorized_client.get(f"/posts/{post_id}")
+
+    res = authorized_client.get(
+        f"/posts/{post_id}",
+        headers={"If-Modified-Since": res.headers["Last-Modified"]},
+    )
+
+    assert res.status_code == 304
+
+
+def test_get_post_modified_after_update(authorized_client, test_posts):
+    post_id = test_posts[0].id
+    etag = authorized_client.get(f"/posts/{post_id}").headers["ETag"]
+    authorized_client.put(
+        f"/posts/{post_id}", json={"title": "updated", "content": "updated"}
+    )
+
+    res = authorized_client.get(f"/posts/{post_id}", headers={"If-None-Match": etag})
+
+    assert res.status_code == 200
+    assert res.json()["Post"]["title"] == "updated"
+    assert res.headers["ETag"] != etag
+
+
+def test_get_private_post_with_etag(authorized_client, test_posts):
+    # validators don't get around the privacy check
+    res = authorized_client.get(
+        f"/posts/{test_posts[18].id}", headers={"If-None-Match": "*"}
+    )
+
+    assert res.status_code == 401
+
+
+def test_get_posts_not_modified_until_voted(authorized_client, test_posts):
+    post_id = test_posts[12].id
+    etag = authorized_client.get("/posts/").headers["ETag"]
+
+    res = authorized_client.get("/posts/", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+
+    authorized_client.post("/vote/", json={"post_id": post_id, "dir": 1})
+
+    res = authorized_client.get("/posts/", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+
+
+def test_get_posts_query_count(authorized_client, test_posts, assert_queries):
+    # the first request also loads the user into the auth cache
+    authorized_client.get("/posts/")
+
+    # the page's ids from the feed, then the posts with their owners joined
+    # in, not lazy loaded per post
+    with assert_queries(2):
+        res = authorized_client.get("/posts/", params={"limit": 10})
+
+    assert len(res.json()) == 10
+
+
+def test_get_post_query_count(authorized_client, test_posts, assert_queries):
+    authorized_client.get("/posts/")
+
+    with assert_queries(1):
+        res = authorized_client.get(f"/posts/{test_posts[12].id}")
+
+    assert res.json()["Post"]["owner"]["username"] == "test1"
+
+
+def test_create_post_query_count(authorized_client, test_user, assert_queries):
+    authorized_client.get("/posts/")
+
+    # the post and its feed entry
+    with assert_queries(2):
+        res = authorized_client.post(
+            "/posts/", json={"title": "title", "content": "content", "private": False}
+        )
+
+    assert res.json()["owner"]["id"] == test_user["id"]
+
+
+def test_update_post_query_count(authorized_client, test_posts, assert_queries):
+    post_id = test_posts[0].id
+    authorized_client.get("/posts/")
+
+    with assert_queries(2):
+        res = authorized_client.put(
+            f"/posts/{post_id}", json={"title": "updated", "content": "updated"}
+        )
+
+    assert res.json()["owner"]["username"] == "test"
+
+
+def feed_titles(client, **params) -> list:
+    res = client.get("/posts/", params=params)
+    assert res.status_code == 200
+    return [post["Post"]["title"] for post in res.json()]
+
+
+def all_pages(client, limit: int) -> list:
+    pages, params = [], {"limit": limit}
+    while True:
+        res = client.get("/posts/", params=params)
+        pages.append([post["Post"]["title"] for post in res.json()])
+        if "X-Next-Cursor" not in res.headers:
+            return pages
+        params["cursor"] = res.headers["X-Next-Cursor"]
+
+
+def test_feed_pages_match_full_query(authorized_client, test_posts, monkeypatch):
+    # 18 visible posts, the last page of 7 runs past the feed's posts and
+    # is read the old way
+    pages = all_pages(authorized_client, 7)
+
+    monkeypatch.setattr(settings, "feed_window_days", -1)
+    assert pages == all_pages(authorized_client, 7)
+    assert [len(page) for page in pages] == [7, 7, 4]
+
+
+def test_feed_not_rebuilt_falls_back(
+    authorized_client, test_posts, session, monkeypatch
+):
+    # as before a deploy's first rebuild: the feed is empty, and the user's
+    # own 6 private posts alone would fill a page of 5
+    session.query(models.FeedState).delete()
+    session.query(models.FeedPost).delete()
+    session.commit()
+    feed.feed_state_cache.clear()
+    pages = all_pages(authorized_client, 5)
+
+    monkeypatch.setattr(settings, "feed_window_days", -1)
+    assert pages == all_pages(authorized_client, 5)
+    assert "6th - u2 pub" in pages[0]
+
+
+def test_feed_window_raised_after_rebuild(
+    authorized_client, test_posts, test_user, session, monkeypatch
+):
+    # posts from before the rebuild's window: one left out of the feed, and
+    # an older one that got an entry when it was made public
+    old = feed.horizon() - feed.timedelta(days=1)
+    older = models.Post(
+        title="older", content="c", owner_id=test_user["id"], created_at=old
+    )
+    session.add_all(
+        [
+            models.Post(
+                title="old", content="c", private=False, owner_id=test_user["id"]
+            ),
+            older,
+        ]
+    )
+    session.flush()
+    session.query(models.Post).filter(models.Post.title == "old").update(
+        {"created_at": old + feed.timedelta(hours=1)}
+    )
+    session.commit()
+    authorized_client.put(
+        f"/posts/{older.id}", json={"title": "older", "content": "c", "private": False}
+    )
+    monkeypatch.setattr(settings, "feed_window_days", 60)
+
+    titles = feed_titles(authorized_client, limit=19)
+
+    assert titles[-1] == "old"
+
+
+def test_feed_follows_post_writes(authorized_client, test_posts, test_user2, session):
+    res = authorized_client.post(
+        "/posts/", json={"title": "new public", "content": "c", "private": False}
+    )
+    new_id = res.json()["id"]
+    assert feed_titles(authorized_client)[0] == "new public"
+
+    # made private, it stays visible to its owner only
+    authorized_client.put(
+        f"/posts/{new_id}", json={"title": "now private", "content": "c"}
+    )
+    assert session.get(models.FeedPost, new_id) is None
+    assert feed_titles(authorized_client)[0] == "now private"
+
+    authorized_client.put(
+        f"/posts/{new_id}",
+        json={"title": "public again", "content": "c", "private": False},
+    )
+    assert session.get(models.FeedPost, new_id) is not None
+
+    authorized_client.delete(f"/posts/{new_id}")
+    assert session.get(models.FeedPost, new_id) is None
+
+
+def test_feed_private_posts_of_others_hidden(client, test_posts, test_user2):
+    token = create_access_token({"user_id": test_user2["id"]})
+    client.headers = {**client.headers, "Authorization": f"Bearer {token}"}
+
+    titles = feed_titles(client, limit=18)
+
+    assert len(titles) == 18
+    assert not any("u1 pri" in title for title in titles)
+
+
+def test_feed_window_falls_back(authorized_client, test_posts, monkeypatch):
+    # nothing is recent enough for the feed, every page takes the full query
+    monkeypatch.setattr(settings, "feed_window_days", -1)
+
+    assert len(feed_titles(authorized_client, limit=10)) == 10
+
+
+def test_trim_feed(test_posts, session, monkeypatch):
+    monkeypatch.setattr(feed, "get_engine", lambda: engine)
+    assert session.query(models.FeedPost).count() == 12
+
+    monkeypatch.setattr(settings, "feed_window_days", -1)
+    feed.trim_feed()
+
+    assert session.query(models.FeedPost).count() == 0
@@ -0,0 +1,109 @@
+import pytest
+from app.records import rebuild_records
+
+SETS = [
+    {"date": "2023-01-02", "datapoint": 100, "name": "squat", "reps": 5},
+    {"date": "2023-01-03", "datapoint": 105, "name": "squat", "reps": 3},
+    {"date": "2023-01-09", "datapoint": 120, "name": "squat", "reps": 1},
+    {"date": "2023-01-09", "datapoint": 60, "name": "bench", "reps": 40},
+]
+
+SQUAT_RECORD = {
+    "name": "squat",
+    "e1rm": pytest.approx(124),
+    "e1rm_brzycki": pytest.approx(120),
+    "best_weight": 120,
+    "best_reps": 1,
+    "best_date": "2023-01-09",
+    "max_weight": 120,
+    "best_week": "2023-01-02",
+    "best_week_volume": 815,
+}
+
+
+@pytest.fixture
+def logged_sets(authorized_client):
+    ids = {}
+    for entry in SETS:
+        res = authorized_client.post("/data/exercise/", json=entry)
+        assert res.status_code == 201
+        ids[entry["name"], entry["date"], entry["reps"]] = res.json()["id"]
+    return ids
+
+
+def test_get_record(authorized_client, logged_sets):
+    res = authorized_client.get("/data/exercise/records/squat")
+
+    assert res.status_code == 200
+    assert res.json() == SQUAT_RECORD
+
+
+def test_get_records(authorized_client, logged_sets):
+    res = authorized_client.get("/data/exercise/records/")
+
+    records = res.json()
+    assert [record["name"] for record in records] == ["bench", "squat"]
+    # past 36 reps there is no Brzycki estimate
+    assert records[0]["e1rm"] == pytest.approx(140)
+    assert records[0]["e1rm_brzycki"] is None
+
+
+def test_get_record_is_one_lookup(authorized_client, logged_sets, assert_queries):
+    with assert_queries(1):
+        authorized_client.get("/data/exercise/records/squat")
+
+
+def test_get_record_not_found(authorized_client, logged_sets):
+    res = authorized_client.get("/data/exercise/records/deadlift")
+
+    assert res.status_code == 404
+
+
+def test_get_records_unauthorized(client):
+    res = client.get("/data/exercise/records/")
+
+    assert res.status_code == 401
+
+
+def test_get_volume(authorized_client, logged_sets):
+    res = authorized_client.get("/data/exercise/records/squat/volume")
+
+    assert res.json() == [
+        {"week": "2023-01-02", "volume": 815, "sets": 2},
+        {"week": "2023-01-09", "volume": 120, "sets": 1},
+    ]
+
+
+def test_records_lowered_by_delete(authorized_client, logged_sets):
+    authorized_client.delete(f"/data/exercise/{logged_sets['squat', '2023-01-09', 1]}")
+
+    record = authorized_client.get("/data/exercise/records/squat").json()
+
+    assert record["e1rm"] == pytest.approx(100 * (1 + 5 / 30))
+    assert record["e1rm_brzycki"] == pytest.approx(112.5)
+    assert (record["best_weight"], record["best_reps"]) == (100, 5)
+    assert record["max_weight"] == 105
+
+
+def test_records_follow_renamed_set(authorized_client, logged_sets):
+    authorized_client.put(
+        f"/data/exercise/{logged_sets['bench', '2023-01-09', 40]}",
+        json={"date": "2023-01-09", "datapoint": 130, "name": "squat", "reps": 1},
+    )
+
+    assert authorized_client.get("/data/exercise/records/bench").status_code == 404
+    record = authorized_client.get("/data/exercise/records/squat").json()
+    assert record["best_weight"] == 130
+    volume = authorized_client.get("/data/exercise/records/squat/volume").json()
+    assert volume[-1] == {"week": "2023-01-09", "volume": 250, "sets": 2}
+
+
+def test_rebuild_matches_incremental(
+    authorized_client, logged_sets, test_user, session
+):
+    rebuild_records(session, test_user["id"])
+    session.commit()
+
+    res = authorized_client.get("/data/exercise/records/squat")
+
+    assert res.json() == SQUAT_RECORD
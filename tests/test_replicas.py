@@ -0,0 +1,145 @@
+import time
+import pytest
+from sqlalchemy import create_engine, event, text
+from app import database
+from app.database import get_read_db, get_read_engine
+from app.main import app
+from .conftest import SQLALCHEMY_DATABASE_URL, engine
+
+# statements run on each replica engine
+statements = {}
+
+
+def counting_engine(url=SQLALCHEMY_DATABASE_URL):
+    replica = create_engine(url)
+    statements[replica] = []
+
+    @event.listens_for(replica, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements[replica].append(statement)
+
+    event.listen(replica, "handle_error", database.mark_replica_down)
+    return replica
+
+
+@pytest.fixture
+def replicas(monkeypatch):
+    # two engines on the test database stand in for the replicas, the test
+    # engine is the primary
+    replicas = [counting_engine(), counting_engine()]
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "replica_engines", replicas)
+    database.recent_writers.clear()
+    database.replicas_down.clear()
+    yield replicas
+    database.recent_writers.clear()
+    database.replicas_down.clear()
+    for replica in replicas:
+        statements.pop(replica, None)
+        replica.dispose()
+
+
+@pytest.fixture
+def routed_client(authorized_client, replicas):
+    # route reads for real instead of through the test session
+    del app.dependency_overrides[get_read_db]
+    return authorized_client
+
+
+def replica_statements(replicas):
+    return sum(len(statements[replica]) for replica in replicas)
+
+
+def test_primary_without_replicas(monkeypatch):
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "replica_engines", [])
+
+    assert get_read_engine() is engine
+
+
+def test_replicas_round_robin(replicas):
+    picked = {get_read_engine() for _ in range(4)}
+
+    assert picked == set(replicas)
+
+
+def test_reads_go_to_replicas(routed_client, test_posts, replicas):
+    res = routed_client.get("/posts/")
+
+    assert res.status_code == 200
+    assert len(res.json()) == 10
+    assert replica_statements(replicas) > 0
+
+
+def test_own_writes_read_from_primary(routed_client, test_posts, replicas):
+    res = routed_client.post("/posts/", json={"title": "new", "content": "post"})
+    assert res.status_code == 201
+
+    res = routed_client.get(f"/posts/{res.json()['id']}")
+
+    assert res.status_code == 200
+    assert replica_statements(replicas) == 0
+
+
+def test_own_writes_read_from_primary_on_other_workers(
+    routed_client, test_posts, replicas
+):
+    res = routed_client.post("/posts/", json={"title": "new", "content": "post"})
+    assert database.READ_YOUR_WRITES_COOKIE in res.cookies
+    # the next request lands on a worker that didn't handle the write
+    database.recent_writers.clear()
+
+    res = routed_client.get(f"/posts/{res.json()['id']}")
+
+    assert res.status_code == 200
+    assert replica_statements(replicas) == 0
+
+
+def test_read_your_writes_cookie_of_other_user_ignored(
+    routed_client, test_posts, test_user2, replicas
+):
+    until = time.time() + 1
+    routed_client.cookies.set(
+        database.READ_YOUR_WRITES_COOKIE, f"{test_user2['id']}:{until}"
+    )
+
+    routed_client.get("/posts/")
+
+    assert replica_statements(replicas) > 0
+
+
+def test_other_readers_still_use_replicas(routed_client, test_user, replicas):
+    routed_client.post("/posts/", json={"title": "new", "content": "post"})
+    del routed_client.headers["Authorization"]
+
+    res = routed_client.get(f"/users/{test_user['id']}")
+
+    assert res.status_code == 200
+    assert replica_statements(replicas) > 0
+
+
+def test_read_your_writes_expires(routed_client, test_posts, replicas, monkeypatch):
+    monkeypatch.setattr(database.settings, "database_read_your_writes_seconds", 0)
+    routed_client.post("/posts/", json={"title": "new", "content": "post"})
+
+    routed_client.get("/posts/")
+
+    assert replica_statements(replicas) > 0
+
+
+def test_failed_replica_is_skipped(replicas, monkeypatch):
+    broken = counting_engine(SQLALCHEMY_DATABASE_URL + "?host=/nonexistent")
+    monkeypatch.setattr(database, "replica_engines", [broken])
+
+    with pytest.raises(Exception):
+        with get_read_engine().connect() as conn:
+            conn.execute(text("select 1"))
+
+    assert get_read_engine() is engine
+
+
+def test_replica_pool_metrics(client, replicas):
+    res = client.get("/metrics/pool")
+
+    assert {"primary", "replica_0", "replica_1"} <= set(res.json())
+    assert "checked_out" in res.json()["replica_1"]
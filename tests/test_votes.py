@@ -0,0 +1,67 @@
+import pytest
+from app import schemas
+
+
+def test_vote_on_post(authorized_client, test_posts):
+    post_id = test_posts[12].id
+    res = authorized_client.post("/vote/", json={"post_id": post_id, "dir": 1})
+
+    assert res.status_code == 201
+
+    res = authorized_client.get(f"/posts/{post_id}")
+    assert schemas.PostOut(**res.json()).votes == 1
+
+
+def test_vote_twice_post(authorized_client, test_posts, test_vote):
+    res = authorized_client.post(
+        "/vote/", json={"post_id": test_posts[12].id, "dir": 1}
+    )
+
+    assert res.status_code == 409
+
+
+def test_delete_vote(authorized_client, test_posts, test_vote):
+    post_id = test_posts[12].id
+    res = authorized_client.post("/vote/", json={"post_id": post_id, "dir": 0})
+
+    assert res.status_code == 201
+
+    res = authorized_client.get(f"/posts/{post_id}")
+    assert schemas.PostOut(**res.json()).votes == 0
+
+
+def test_delete_vote_non_exist(authorized_client, test_posts):
+    res = authorized_client.post(
+        "/vote/", json={"post_id": test_posts[12].id, "dir": 0}
+    )
+
+    assert res.status_code == 404
+
+
+def test_vote_post_non_exist(authorized_client, test_posts):
+    res = authorized_client.post("/vote/", json={"post_id": 80000, "dir": 1})
+
+    assert res.status_code == 404
+
+
+def test_vote_private_post(authorized_client, test_posts):
+    res = authorized_client.post(
+        "/vote/", json={"post_id": test_posts[18].id, "dir": 1}
+    )
+
+    assert res.status_code == 401
+
+
+def test_vote_unauthorized_user(client, test_posts):
+    res = client.post("/vote/", json={"post_id": test_posts[12].id, "dir": 1})
+
+    assert res.status_code == 401
+
+
+@pytest.mark.parametrize("dir", [-1, 2])
+def test_vote_invalid_dir(authorized_client, test_posts, dir):
+    res = authorized_client.post(
+        "/vote/", json={"post_id": test_posts[12].id, "dir": dir}
+    )
+
+    assert res.status_code == 422
@@ -0,0 +1,264 @@
+from datetime import date
+import pytest
+from sqlalchemy.exc import IntegrityError
+from app import schemas, models
+from app.downsample import MAX_POINTS
+
+
+def test_get_weights_not_logged_in(client):
+    res = client.get("/data/weight/")
+
+    assert res.status_code == 401
+
+
+def test_get_weights(authorized_client, test_weights):
+    res = authorized_client.get("/data/weight/")
+
+    weights_list = [schemas.DataOut(**weight) for weight in res.json()]
+
+    assert len(weights_list) == 10
+    assert res.status_code == 200
+
+
+def test_add_weight(authorized_client):
+    res = authorized_client.post(
+        "/data/weight/", json={"datapoint": 80, "date": "2023-02-01"}
+    )
+
+    assert res.status_code == 201
+    assert res.json()["datapoint"] == 80
+
+
+def test_add_weight_duplicate_date(authorized_client, test_weights):
+    res = authorized_client.post(
+        "/data/weight/", json={"datapoint": 80, "date": "2023-01-01"}
+    )
+
+    assert res.status_code == 400
+
+
+def test_add_weights_bulk_unauthorized(client):
+    res = client.post("/data/weight/bulk", json={"data": []})
+
+    assert res.status_code == 401
+
+
+def test_add_weights_bulk(authorized_client, test_user, session):
+    data = [{"datapoint": 80, "date": f"2023-03-{day:02}"} for day in range(1, 31)]
+    res = authorized_client.post("/data/weight/bulk", json={"data": data})
+
+    assert res.status_code == 201
+    assert res.json() == {"inserted": 30, "updated": 0, "skipped": 0, "conflicts": []}
+    assert (
+        session.query(models.Weight)
+        .filter(models.Weight.owner_id == test_user["id"])
+        .count()
+        == 30
+    )
+
+
+def test_add_weights_bulk_duplicate_in_request(authorized_client):
+    data = [{"datapoint": 80, "date": "2023-03-01"}] * 2
+    res = authorized_client.post("/data/weight/bulk", json={"data": data})
+
+    assert res.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "on_conflict, status_code, inserted, updated, skipped, datapoint",
+    [
+        ("skip", 201, 1, 0, 1, 81),
+        ("overwrite", 201, 1, 1, 0, 99),
+    ],
+)
+def test_add_weights_bulk_conflict(
+    authorized_client,
+    test_user,
+    test_weights,
+    session,
+    on_conflict,
+    status_code,
+    inserted,
+    updated,
+    skipped,
+    datapoint,
+):
+    data = [
+        {"datapoint": 99, "date": "2023-01-01"},
+        {"datapoint": 99, "date": "2023-02-01"},
+    ]
+    res = authorized_client.post(
+        "/data/weight/bulk", json={"data": data, "on_conflict": on_conflict}
+    )
+
+    result = schemas.DataBulkOut(**res.json())
+
+    assert res.status_code == status_code
+    assert result.inserted == inserted
+    assert result.updated == updated
+    assert result.skipped == skipped
+    assert [str(conflict) for conflict in result.conflicts] == ["2023-01-01"]
+
+    session.expire_all()
+    weight = (
+        session.query(models.Weight)
+        .filter(
+            models.Weight.owner_id == test_user["id"],
+            models.Weight.date == date(2023, 1, 1),
+        )
+        .first()
+    )
+    assert weight.datapoint == datapoint
+
+
+def test_add_weights_bulk_conflict_fail(
+    authorized_client, test_user, session, test_weights
+):
+    data = [
+        {"datapoint": 99, "date": "2023-01-01"},
+        {"datapoint": 99, "date": "2023-02-01"},
+    ]
+    res = authorized_client.post("/data/weight/bulk", json={"data": data})
+
+    assert res.status_code == 409
+    assert res.json()["detail"]["conflicts"] == ["2023-01-01"]
+    assert (
+        session.query(models.Weight)
+        .filter(models.Weight.owner_id == test_user["id"])
+        .count()
+        == 10
+    )
+
+
+def test_weight_unique_owner_date(test_weights, test_user, session):
+    session.add(
+        models.Weight(datapoint=90, date=date(2023, 1, 1), owner_id=test_user["id"])
+    )
+
+    with pytest.raises(IntegrityError):
+        session.commit()
+    session.rollback()
+
+
+def test_get_weights_cursor(authorized_client, test_weights):
+    res = authorized_client.get("/data/weight/?limit=4")
+    first_page = [weight["date"] for weight in res.json()]
+
+    res = authorized_client.get(
+        "/data/weight/",
+        params={"limit": 4, "cursor": res.headers["X-Next-Cursor"]},
+    )
+    second_page = [weight["date"] for weight in res.json()]
+
+    assert first_page == ["2023-01-10", "2023-01-09", "2023-01-08", "2023-01-07"]
+    assert second_page == ["2023-01-06", "2023-01-05", "2023-01-04", "2023-01-03"]
+
+
+def test_get_weights_no_cursor_on_exact_last_page(authorized_client, test_weights):
+    res = authorized_client.get("/data/weight/?limit=5")
+    assert "X-Next-Cursor" in res.headers
+
+    res = authorized_client.get(
+        "/data/weight/",
+        params={"limit": 5, "cursor": res.headers["X-Next-Cursor"]},
+    )
+
+    assert len(res.json()) == 5
+    assert "X-Next-Cursor" not in res.headers
+
+
+@pytest.mark.parametrize(
+    "period, buckets",
+    [
+        ("day", 10),
+        ("week", 3),
+        ("month", 1),
+    ],
+)
+def test_get_weight_stats(authorized_client, test_weights, period, buckets):
+    res = authorized_client.get(f"/data/weight/stats?period={period}")
+
+    stats = schemas.DataStats(**res.json())
+
+    assert res.status_code == 200
+    assert len(stats.buckets) == buckets
+    assert sum(bucket.count for bucket in stats.buckets) == 10
+    assert stats.buckets[-1].max == 90
+    assert len(stats.moving_averages) == 10
+    assert stats.moving_averages[-1].ma_7 == 87
+    assert stats.moving_averages[-1].ma_30 == 85.5
+
+
+def test_get_weight_stats_week_buckets(authorized_client, test_weights):
+    res = authorized_client.get("/data/weight/stats?period=week")
+
+    buckets = schemas.DataStats(**res.json()).buckets
+
+    # 2023-01-01 is a Sunday, weeks start on Monday
+    assert [str(bucket.start) for bucket in buckets] == [
+        "2022-12-26",
+        "2023-01-02",
+        "2023-01-09",
+    ]
+    assert (buckets[1].min, buckets[1].max, buckets[1].mean) == (82, 88, 85)
+
+
+def test_get_weight_stats_date_range(authorized_client, test_weights):
+    res = authorized_client.get(
+        "/data/weight/stats", params={"start": "2023-01-05", "end": "2023-01-08"}
+    )
+
+    stats = schemas.DataStats(**res.json())
+
+    assert [bucket.mean for bucket in stats.buckets] == [85, 86, 87, 88]
+    # averages still include the days before start
+    assert stats.moving_averages[0].date == date(2023, 1, 5)
+    assert stats.moving_averages[0].ma_7 == 83
+
+
+def test_get_weights_not_modified(authorized_client, test_weights):
+    etag = authorized_client.get("/data/weight/").headers["ETag"]
+
+    res = authorized_client.get("/data/weight/", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+
+    authorized_client.put("/data/weight/2023-01-10", json={"datapoint": 70})
+
+    res = authorized_client.get("/data/weight/", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+
+
+def test_get_weights_date_range(authorized_client, test_weights):
+    res = authorized_client.get(
+        "/data/weight/", params={"start": "2023-01-03", "end": "2023-01-05"}
+    )
+
+    assert [weight["date"] for weight in res.json()] == [
+        "2023-01-05",
+        "2023-01-04",
+        "2023-01-03",
+    ]
+
+
+def test_get_weights_max_points(authorized_client, test_weights):
+    # more points than a page, the whole range is downsampled instead
+    res = authorized_client.get(
+        "/data/weight/", params={"limit": 2, "max_points": 4, "end": "2023-01-09"}
+    )
+
+    dates = [weight["date"] for weight in res.json()]
+
+    assert res.status_code == 200
+    assert len(dates) == 4
+    assert (dates[0], dates[-1]) == ("2023-01-09", "2023-01-01")
+    assert "X-Next-Cursor" not in res.headers
+
+
+@pytest.mark.parametrize("max_points", [2, MAX_POINTS + 1])
+def test_get_weights_max_points_out_of_range(
+    authorized_client, test_weights, max_points
+):
+    res = authorized_client.get("/data/weight/", params={"max_points": max_points})
+
+    assert res.status_code == 422